@@ -0,0 +1,19 @@
+# Reusable building blocks for the research of sales apartments.
+
+from .aggregation import REPORT_BREAKDOWNS, Breakdowns, compute_breakdowns
+from .anomalies import score_listings, suspicious_listings
+from .baseline import MarketBaseline
+from .cache import load_clean, load_correlations
+from .cleaning import CLEANING_VERSION, OUTLIER_RULES, clean, filter_outliers
+from .comps import CompsIndex
+from .correlation import correlation_matrix, grouped_correlations
+from .features import FLOOR_RULES, add_features, floor_categories, price_gradient
+from .imputation import GroupMedianImputer, fit_imputer
+from .loading import COLUMNS, SCHEMA, load_data
+from .locality import CITY, LOCALITY_NAMES, normalize_locality_names
+from .model import HedonicModel
+from .pipeline import STAGES, Pipeline
+from .profiling import MissingProfile
+from .sketches import QuantileSketch, SketchTable
+from .spatial import DISTANCE_BANDS, DistanceGrid
+from .store import ColumnStore, open_store, write_store
@@ -0,0 +1,206 @@
+import argparse
+import os
+import sys
+
+from .anomalies import THRESHOLD, suspicious_listings
+from .baseline import MarketBaseline
+from .cache import CACHE_DIR, cache_path, config_hash, file_hash, load_clean, load_correlations
+from .cleaning import clean as clean_listings, filter_outliers
+from .comps import K, CompsIndex
+from .correlation import METHODS
+from .features import add_features
+from .loading import COLUMNS, load_data
+from .parallel import run_parallel
+from .pipeline import Pipeline, compare_traces, read_trace, write_trace
+from .store import write_store
+from .streaming import CHUNKSIZE, PIVOTS, stream_report
+
+
+def info(args):
+    data = load_data(args.path, usecols=args.usecols)
+    data.info(memory_usage='deep')
+
+
+def clean(args):
+    data = load_clean(args.path, cache_dir=args.cache_dir, impute=args.impute)
+    target = cache_path(args.path, args.cache_dir, args.impute)
+    print('{} rows cleaned, cached in {}'.format(len(data), target))
+
+
+def stream(args):
+    report = stream_report(args.path, chunksize=args.chunksize)
+    print('{} rows read, {} rows kept'.format(report.rows_in, report.rows_out))
+    print(report.summary().to_string())
+    for name in PIVOTS:
+        print()
+        print(report.pivot(name).to_string())
+    print()
+    print(report.localities_price().head(10).to_string())
+    print()
+    print(report.center_price().to_string())
+
+
+def score(args):
+    data = add_features(load_clean(args.path, cache_dir=args.cache_dir))
+    if args.baseline:
+        scores = MarketBaseline.load(args.baseline).score(data, threshold=args.threshold)
+        flagged = data.join(scores)[scores['suspicious']]
+    else:
+        flagged = suspicious_listings(data, threshold=args.threshold)
+    print('{} of {} listings are suspicious'.format(len(flagged), len(data)))
+    if args.output:
+        flagged.to_csv(args.output, sep='\t')
+
+
+def baseline(args):
+    data = add_features(load_clean(args.path, cache_dir=args.cache_dir))
+    if args.update:
+        market = MarketBaseline.load(args.baseline).update(data)
+    else:
+        market = MarketBaseline.fit(data)
+    market.save(args.baseline)
+    print('{} sales in the market baseline {}'.format(market.tables()[-1]['count'].sum(), args.baseline))
+
+
+def process(args):
+    data, report = run_parallel(args.path, n_jobs=args.jobs)
+    print(report.to_string())
+    print('{} rows kept'.format(len(data)))
+    if args.output:
+        data.to_parquet(args.output, index=False)
+
+
+def store(args):
+    data = add_features(load_clean(args.path, cache_dir=args.cache_dir))
+    write_store(data, args.store, source=args.path,
+                sha256=file_hash(args.path, args.cache_dir), config=config_hash())
+    print('{} rows and {} columns written to {}'.format(len(data), data.shape[1], args.store))
+
+
+def comps(args):
+    data = add_features(load_clean(args.path, cache_dir=args.cache_dir))
+    feed = add_features(clean_listings(load_data(args.feed)))
+    found = CompsIndex(data).query(feed, k=args.k)
+    found = found.join(data[['locality_name', 'total_area', 'rooms', 'price_per_meter']],
+                       on='comp')
+    print('{} comparable listings for {} listings'.format(len(found), len(feed)))
+    if args.output:
+        found.to_csv(args.output, sep='\t', index=False)
+    else:
+        print(found.head(args.k * 3).to_string())
+
+
+def report(args):
+    # matplotlib is only needed for the figures
+    from .report import render_report
+
+    data, _ = filter_outliers(load_clean(args.path, cache_dir=args.cache_dir))
+    status = render_report(add_features(data), args.output, n_jobs=args.jobs)
+    print(status.to_string())
+    print('report written to {}'.format(os.path.join(args.output, 'index.html')))
+
+
+def corr(args):
+    correlations = load_correlations(args.path, method=args.method, by=args.by,
+                                     cache_dir=args.cache_dir)
+    print(correlations.round(2).to_string())
+
+
+def trace(args):
+    pipeline = Pipeline()
+    pipeline.run(args.path)
+    print(pipeline.report().to_string())
+    if args.compare:
+        print()
+        print(compare_traces(read_trace(args.compare), pipeline.trace).round(3).to_string())
+    if args.output:
+        write_trace(pipeline.trace, args.output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m apartments')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('info', help='load the listings file and describe it')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('--usecols', nargs='+', choices=COLUMNS, metavar='COLUMN',
+                         help='load only these columns')
+    command.set_defaults(func=info)
+
+    command = commands.add_parser('clean', help='clean the listings file and cache the result')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('--cache-dir', default=CACHE_DIR, help='where cleaned copies are kept')
+    command.add_argument('--impute', action='store_true',
+                         help='fill the gaps from the medians of similar listings first')
+    command.set_defaults(func=clean)
+
+    command = commands.add_parser('stream', help='summarize a file too large for memory, in chunks')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='rows read at a time')
+    command.set_defaults(func=stream)
+
+    command = commands.add_parser('process', help='clean, filter and derive the columns on all cores')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('--jobs', type=int, help='number of processes, all the cores by default')
+    command.add_argument('--output', help='write the result to this Parquet file')
+    command.set_defaults(func=process)
+
+    command = commands.add_parser('score', help='flag listings priced far from their peers')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('--threshold', type=float, default=THRESHOLD,
+                         help='modified z-score above which a listing is suspicious')
+    command.add_argument('--output', help='write the suspicious listings to this file')
+    command.add_argument('--baseline', help='score against this saved market baseline '
+                                            'instead of the listings of the file')
+    command.add_argument('--cache-dir', default=CACHE_DIR, help='where cleaned copies are kept')
+    command.set_defaults(func=score)
+
+    command = commands.add_parser('baseline', help='build or update the market baseline')
+    command.add_argument('path', help='tab separated file of sales')
+    command.add_argument('baseline', help='json file of the market baseline')
+    command.add_argument('--update', action='store_true',
+                         help='fold the sales into an existing baseline')
+    command.add_argument('--cache-dir', default=CACHE_DIR, help='where cleaned copies are kept')
+    command.set_defaults(func=baseline)
+
+    command = commands.add_parser('comps', help='find the most similar past listings of new ones')
+    command.add_argument('path', help='tab separated file of past listings')
+    command.add_argument('feed', help='tab separated file of the listings to value')
+    command.add_argument('-k', type=int, default=K, help='comparable listings per listing')
+    command.add_argument('--output', help='write the comparable listings to this file')
+    command.add_argument('--cache-dir', default=CACHE_DIR, help='where cleaned copies are kept')
+    command.set_defaults(func=comps)
+
+    command = commands.add_parser('corr', help='correlations of all the numeric columns, '
+                                               'without the outliers')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('--method', choices=METHODS, default='pearson')
+    command.add_argument('--by', help='a matrix for every value of this column, e.g. year')
+    command.add_argument('--cache-dir', default=CACHE_DIR, help='where cleaned copies are kept')
+    command.set_defaults(func=corr)
+
+    command = commands.add_parser('trace', help='time every step of the research and its memory')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('--output', help='write the trace to this json file')
+    command.add_argument('--compare', metavar='TRACE', help='compare with the trace of an earlier run')
+    command.set_defaults(func=trace)
+
+    command = commands.add_parser('report', help='draw the figures of the research to an html page')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('output', help='directory of the figures and index.html')
+    command.add_argument('--jobs', type=int, help='number of processes, all the cores by default')
+    command.add_argument('--cache-dir', default=CACHE_DIR, help='where cleaned copies are kept')
+    command.set_defaults(func=report)
+
+    command = commands.add_parser('store', help='write the cleaned listings as memory mapped columns')
+    command.add_argument('path', help='tab separated listings file')
+    command.add_argument('store', help='directory of the column store')
+    command.add_argument('--cache-dir', default=CACHE_DIR, help='where cleaned copies are kept')
+    command.set_defaults(func=store)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
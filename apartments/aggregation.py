@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+from .locality import CITY, LocalityIndex
+
+
+AGGREGATIONS = ['count', 'sum', 'mean', 'median', 'min', 'max']
+
+# The pivot tables of the research: index, values, aggfunc and, for some,
+# a filter on the rows as {column: value}.
+REPORT_BREAKDOWNS = {
+    'pivot_rooms': ('rooms', 'last_price', 'median'),
+    'pivot_floor_apartment': ('floor_apartment', 'last_price', 'median'),
+    'day_price': ('day', 'last_price', 'median'),
+    'month_price': ('month', 'last_price', 'median'),
+    'year_price': ('year', 'last_price', 'median'),
+    'localities_price': ('locality_name', 'price_per_meter', ['count', 'mean']),
+    'center_price': ('km_to_center', 'last_price', 'mean', {'locality_name': CITY}),
+}
+
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _ordered_stat(ordered, counts, aggfunc):
+    # `ordered` holds the values of group 0, then of group 1 and so on,
+    # each group sorted; `counts` is the size of every group
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype('int64')
+    result = np.full(len(counts), np.nan)
+    filled = counts > 0
+    starts, counts = starts[filled], counts[filled]
+    if aggfunc == 'min':
+        result[filled] = ordered[starts]
+    elif aggfunc == 'max':
+        result[filled] = ordered[starts + counts - 1]
+    else:
+        result[filled] = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+    return result
+
+
+def group_medians(codes, values, size):
+    """Median and count of `values` for every group code from 0 to size - 1.
+
+    Negative codes and missing values are left out; empty groups get NaN.
+    """
+    valid = np.flatnonzero((codes >= 0) & ~np.isnan(values))
+    order = valid[np.lexsort((values[valid], codes[valid]))]
+    counts = np.bincount(codes[order], minlength=size)
+    return _ordered_stat(values[order], counts, 'median'), counts
+
+
+class Breakdowns:
+    """Median, mean and count tables over one frame that share their work.
+
+    Every grouping column is factorized once and every value column is
+    sorted once, no matter how many tables use them. A median table then
+    only needs a stable integer sort of the group codes, which keeps the
+    values sorted inside every group. The tables look like the ones of
+    DataFrame.pivot_table, without the groups that have no values.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._codes = {}
+        self._values = {}
+        self._order = {}
+        self._masks = {}
+        self._localities = {}
+
+    def codes(self, index):
+        """Group codes (-1 for missing keys) and the index of the groups."""
+        index = tuple(_as_list(index))
+        if index in self._codes:
+            return self._codes[index]
+
+        if len(index) == 1:
+            codes, uniques = pd.factorize(self.data[index[0]], sort=True)
+            groups = pd.Index(uniques, name=index[0])
+        else:
+            parts = [self.codes(column) for column in index]
+            missing = np.any([codes < 0 for codes, _ in parts], axis=0)
+            combined = np.ravel_multi_index(
+                [np.where(missing, 0, codes) for codes, _ in parts],
+                [max(len(groups), 1) for _, groups in parts],
+            )
+            codes, uniques = pd.factorize(combined, sort=True)
+            codes[missing] = -1
+            levels = np.unravel_index(uniques, [max(len(groups), 1) for _, groups in parts])
+            groups = pd.MultiIndex.from_arrays(
+                [groups[level] for (_, groups), level in zip(parts, levels)],
+                names=list(index),
+            )
+        # the smallest integer type makes the stable sort a radix sort
+        codes = codes.astype(np.min_scalar_type(-max(len(groups), 1)))
+        self._codes[index] = codes, groups
+        return codes, groups
+
+    def values(self, column):
+        if column not in self._values:
+            self._values[column] = self.data[column].to_numpy(dtype='float64', na_value=np.nan)
+        return self._values[column]
+
+    def order(self, column):
+        # positions of the non missing values, from the smallest value
+        if column not in self._order:
+            values = self.values(column)
+            order = np.argsort(values, kind='stable')
+            self._order[column] = order[:np.count_nonzero(~np.isnan(values))]
+        return self._order[column]
+
+    def _mask(self, where):
+        key = tuple(sorted(where.items()))
+        if key not in self._masks:
+            mask = np.ones(len(self.data), dtype=bool)
+            for column, value in key:
+                if isinstance(self.data[column].dtype, pd.CategoricalDtype):
+                    if column not in self._localities:
+                        self._localities[column] = LocalityIndex(self.data[column])
+                    mask &= self._localities[column].mask(value)
+                else:
+                    mask &= (self.data[column] == value).fillna(False).to_numpy(dtype=bool)
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def _aggregate(self, codes, size, column, aggfunc):
+        values = self.values(column)
+        valid = (codes >= 0) & ~np.isnan(values)
+        counts = np.bincount(codes[valid], minlength=size)
+        if aggfunc == 'count':
+            return counts
+        if aggfunc in ('sum', 'mean'):
+            sums = np.bincount(codes[valid], weights=values[valid], minlength=size)
+            if aggfunc == 'sum':
+                return sums
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return sums / counts
+        if aggfunc not in AGGREGATIONS:
+            raise ValueError('unknown aggfunc: {}'.format(aggfunc))
+
+        order = self.order(column)
+        order = order[codes[order] >= 0]
+        order = order[np.argsort(codes[order], kind='stable')]
+        return _ordered_stat(values[order], counts, aggfunc)
+
+    def pivot(self, index, values, aggfunc='median', where=None):
+        """Table of `values` aggregated by `index`, like pivot_table.
+
+        `aggfunc` is one of AGGREGATIONS or a list of them, `where` keeps
+        only the rows whose columns have the given values.
+        """
+        codes, groups = self.codes(index)
+        if where:
+            codes = np.where(self._mask(where), codes, -1)
+        columns = _as_list(values)
+        aggfuncs = _as_list(aggfunc)
+
+        table = {}
+        present = np.zeros(len(groups), dtype=bool)
+        for func in aggfuncs:
+            for column in columns:
+                result = self._aggregate(codes, len(groups), column, func)
+                table[(func, column)] = result
+        for column in columns:
+            present |= self._aggregate(codes, len(groups), column, 'count') > 0
+
+        table = pd.DataFrame(table, index=groups)[present]
+        if not isinstance(aggfunc, (list, tuple)):
+            table.columns = table.columns.droplevel(0)
+        return table
+
+
+def compute_breakdowns(data, specs=None):
+    """All the tables of `specs` ({name: (index, values, aggfunc[, where])})."""
+    if specs is None:
+        specs = REPORT_BREAKDOWNS
+    breakdowns = Breakdowns(data)
+    return {name: breakdowns.pivot(*spec) for name, spec in specs.items()}
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from .aggregation import Breakdowns, group_medians
+
+
+# Distance bands from the city center, in km.
+KM_BANDS = [0, 3, 7, 12, 20, 35, np.inf]
+
+# Peer groups from the most to the least specific. A listing is compared
+# with the first group that has enough peers and some spread of prices.
+PEER_LEVELS = [
+    ['locality_name', 'rooms', 'km_band', 'year'],
+    ['locality_name', 'rooms', 'km_band'],
+    ['locality_name', 'rooms'],
+    ['locality_name'],
+    [],
+]
+
+MIN_PEERS = 10
+
+# Usual cut for the modified z-score (Iglewicz and Hoaglin).
+THRESHOLD = 3.5
+
+# Makes the MAD comparable with the standard deviation of a normal sample.
+MAD_SCALE = 0.6745
+
+
+def km_bands(km_to_center, bands=None):
+    if bands is None:
+        bands = KM_BANDS
+    return pd.cut(km_to_center, bands, right=False)
+
+
+def peer_keys(data):
+    """The columns that define the peers of every listing."""
+    return pd.DataFrame({
+        'locality_name': data['locality_name'],
+        'rooms': data['rooms'],
+        'km_band': km_bands(data['km_to_center']),
+        'year': data['year'],
+    }, index=data.index)
+
+
+def robust_scores(values, medians, mads):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return MAD_SCALE * (values - medians) / mads
+
+
+def score_listings(data, value='price_per_meter', levels=None, min_peers=MIN_PEERS,
+                   threshold=THRESHOLD):
+    """Robust deviation of every listing from the price of its peers.
+
+    For every peer level the group medians and median absolute deviations
+    are computed once over the whole frame and broadcast back through the
+    group codes. Every listing takes the first level where its group has
+    at least `min_peers` prices with a non zero MAD. The result has the
+    peer median, MAD and count, the level used, the modified z-score and
+    a `suspicious` flag for |score| > threshold. Negative scores are
+    listings cheaper than their peers.
+    """
+    if levels is None:
+        levels = PEER_LEVELS
+    values = data[value].to_numpy(dtype='float64', na_value=np.nan)
+    breakdowns = Breakdowns(peer_keys(data))
+
+    n = len(data)
+    medians = np.full(n, np.nan)
+    mads = np.full(n, np.nan)
+    counts = np.zeros(n, dtype='int64')
+    level_of = np.full(n, -1, dtype='int8')
+
+    for number, level in enumerate(levels):
+        pending = level_of < 0
+        if not pending.any():
+            break
+        if level:
+            codes, groups = breakdowns.codes(level)
+            size = len(groups)
+        else:
+            codes, size = np.zeros(n, dtype='int8'), 1
+        codes = codes.astype('int64')
+
+        group_median, group_count = group_medians(codes, values, size)
+        known = codes >= 0
+        row_median = np.where(known, group_median[codes], np.nan)
+        group_mad, _ = group_medians(codes, np.abs(values - row_median), size)
+        usable = (group_count >= min_peers) & (group_mad > 0)
+
+        take = pending & known & usable[codes]
+        medians[take] = group_median[codes[take]]
+        mads[take] = group_mad[codes[take]]
+        counts[take] = group_count[codes[take]]
+        level_of[take] = number
+
+    scores = robust_scores(values, medians, mads)
+    names = ['+'.join(level) or 'all' for level in levels] + ['none']
+    return pd.DataFrame({
+        'peer_median': medians,
+        'peer_mad': mads,
+        'peers': counts,
+        'peer_level': pd.Categorical.from_codes(
+            np.where(level_of < 0, len(levels), level_of), categories=names),
+        'score': scores,
+        'suspicious': np.abs(np.nan_to_num(scores)) > threshold,
+    }, index=data.index)
+
+
+def suspicious_listings(data, **kwargs):
+    """The listings flagged by score_listings, the most extreme first."""
+    scores = score_listings(data, **kwargs)
+    flagged = data.join(scores)[scores['suspicious']]
+    return flagged.reindex(flagged['score'].abs().sort_values(ascending=False).index)
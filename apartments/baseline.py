@@ -0,0 +1,179 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from .anomalies import MIN_PEERS, THRESHOLD, robust_scores
+from .sketches import QuantileSketch
+
+
+# The market is described by groups of these columns. Coarser groups are
+# the prefixes of the list, down to the whole market, and are used for
+# listings whose group is too small.
+BASELINE_KEYS = ['locality_name', 'rooms', 'floor_apartment', 'km_to_center']
+
+# Groups with up to this many sales keep them, so their median and MAD
+# are exact; larger groups fall back to the sketch.
+EXACT_PEERS = 1000
+
+BASELINE_VERSION = 2
+
+
+def _plain(value):
+    # numpy scalars do not go to json
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _key_frame(data, level):
+    # lookup keys as plain objects, so categories and nullable ints
+    # compare equal to the values stored in the baseline
+    return pd.DataFrame({
+        column: data[column].astype(object).where(data[column].notna(), None)
+        for column in level
+    }, index=data.index)
+
+
+class MarketBaseline:
+    """Distribution of the price per meter of every market group.
+
+    Every group keeps a mergeable quantile sketch, so new sales are folded
+    in with `update` without going back to the old ones, and the baseline
+    is saved to and loaded from a small json file. `score` compares a
+    batch of new listings with the median and MAD of their groups, exact
+    for the groups of up to `exact_peers` sales.
+    """
+
+    def __init__(self, keys=None, value='price_per_meter', relative_accuracy=0.005,
+                 min_peers=MIN_PEERS, exact_peers=EXACT_PEERS):
+        self.keys = list(BASELINE_KEYS if keys is None else keys)
+        self.value = value
+        self.relative_accuracy = relative_accuracy
+        self.min_peers = min_peers
+        self.exact_peers = exact_peers
+        self.levels = [self.keys[:size] for size in range(len(self.keys), -1, -1)]
+        self.groups = [{} for _ in self.levels]
+        self._tables = None
+
+    @classmethod
+    def fit(cls, data, **kwargs):
+        return cls(**kwargs).update(data)
+
+    def update(self, data):
+        """Fold new sales into the baseline."""
+        values = data[self.value].to_numpy(dtype='float64', na_value=np.nan)
+        values = pd.Series(values, index=data.index)
+        for level, groups in zip(self.levels, self.groups):
+            if level:
+                grouped = values.groupby([data[column] for column in level],
+                                         observed=True, dropna=True)
+            else:
+                grouped = [((), values)]
+            for key, group in grouped:
+                key = tuple(_plain(part) for part in (key if isinstance(key, tuple) else (key,)))
+                sketch = groups.get(key)
+                if sketch is None:
+                    sketch = groups[key] = QuantileSketch(self.relative_accuracy, self.exact_peers)
+                sketch.update(group.to_numpy())
+        self._tables = None
+        return self
+
+    def merge(self, other):
+        if other.keys != self.keys or other.value != self.value:
+            raise ValueError('cannot merge baselines of different groups')
+        for groups, others in zip(self.groups, other.groups):
+            for key, sketch in others.items():
+                if key in groups:
+                    groups[key].merge(sketch)
+                else:
+                    groups[key] = QuantileSketch.from_dict(sketch.to_dict())
+        self._tables = None
+        return self
+
+    def tables(self):
+        """Median, MAD and count of every group, one table per level."""
+        if self._tables is None:
+            self._tables = []
+            for level, groups in zip(self.levels, self.groups):
+                keys = list(groups)
+                sketches = [groups[key] for key in keys]
+                index = (pd.MultiIndex.from_tuples(keys, names=level) if level
+                         else pd.RangeIndex(len(keys)))
+                self._tables.append(pd.DataFrame({
+                    'median': [sketch.median() for sketch in sketches],
+                    'mad': [sketch.mad() for sketch in sketches],
+                    'count': [sketch.count for sketch in sketches],
+                }, index=index))
+        return self._tables
+
+    def score(self, data, threshold=THRESHOLD):
+        """Score a batch of listings against the baseline.
+
+        The listings need the baseline keys and the value column, e.g. after
+        features.add_features. Returns the same columns as
+        anomalies.score_listings.
+        """
+        values = data[self.value].to_numpy(dtype='float64', na_value=np.nan)
+        n = len(data)
+        medians = np.full(n, np.nan)
+        mads = np.full(n, np.nan)
+        counts = np.zeros(n, dtype='int64')
+        level_of = np.full(n, -1, dtype='int8')
+
+        for number, (level, table) in enumerate(zip(self.levels, self.tables())):
+            pending = level_of < 0
+            if not pending.any() or not len(table):
+                continue
+            if level:
+                keys = _key_frame(data, level)
+                rows = table.index.get_indexer(pd.MultiIndex.from_frame(keys))
+            else:
+                rows = np.zeros(n, dtype='int64')
+            usable = ((table['count'] >= self.min_peers) & (table['mad'] > 0)).to_numpy()
+            take = pending & (rows >= 0)
+            take[take] = usable[rows[take]]
+            medians[take] = table['median'].to_numpy()[rows[take]]
+            mads[take] = table['mad'].to_numpy()[rows[take]]
+            counts[take] = table['count'].to_numpy()[rows[take]]
+            level_of[take] = number
+
+        scores = robust_scores(values, medians, mads)
+        names = ['+'.join(level) or 'all' for level in self.levels] + ['none']
+        return pd.DataFrame({
+            'peer_median': medians,
+            'peer_mad': mads,
+            'peers': counts,
+            'peer_level': pd.Categorical.from_codes(
+                np.where(level_of < 0, len(self.levels), level_of), categories=names),
+            'score': scores,
+            'suspicious': np.abs(np.nan_to_num(scores)) > threshold,
+        }, index=data.index)
+
+    def save(self, path):
+        state = {
+            'version': BASELINE_VERSION,
+            'keys': self.keys,
+            'value': self.value,
+            'relative_accuracy': self.relative_accuracy,
+            'min_peers': self.min_peers,
+            'exact_peers': self.exact_peers,
+            'groups': [
+                [[list(key), sketch.to_dict()] for key, sketch in groups.items()]
+                for groups in self.groups
+            ],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        # version 1 baselines have no exact values and are read as sketches
+        if state['version'] not in (1, BASELINE_VERSION):
+            raise ValueError('unsupported baseline version: {}'.format(state['version']))
+        baseline = cls(state['keys'], state['value'], state['relative_accuracy'],
+                       state['min_peers'], state.get('exact_peers', 0))
+        for groups, saved in zip(baseline.groups, state['groups']):
+            for key, sketch in saved:
+                groups[tuple(key)] = QuantileSketch.from_dict(sketch)
+        return baseline
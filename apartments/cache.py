@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import warnings
+
+import pandas as pd
+
+from .cleaning import EXTREME_COLUMNS, OUTLIER_RULES, clean, cleaning_config, filter_outliers
+from .correlation import correlation_matrix, grouped_correlations
+from .features import add_features
+from .imputation import GroupMedianImputer, fit_imputer
+from .loading import SCHEMA, load_data
+
+
+CACHE_DIR = '.cache'
+
+_HASHES_FILE = 'hashes.json'
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def file_hash(path, cache_dir=CACHE_DIR, block_size=1 << 20):
+    """SHA-256 of the file content.
+
+    The digest is remembered together with the size and modification time
+    of the file, so an unchanged file is not read again on the next run.
+    """
+    stat = os.stat(path)
+    hashes_path = os.path.join(cache_dir, _HASHES_FILE)
+    hashes = _read_json(hashes_path)
+    key = os.path.abspath(path)
+    known = hashes.get(key)
+    if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime_ns:
+        return known['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+
+    hashes[key] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': sha256}
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(hashes_path, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=1)
+    return sha256
+
+
+def _imputation_config():
+    imputer = GroupMedianImputer()
+    return {
+        'columns': imputer.columns,
+        'levels': imputer.levels,
+        'local_columns': sorted(imputer.local_columns),
+        'min_count': imputer.min_count,
+    }
+
+
+def config_hash(impute=False):
+    config = dict(cleaning_config(), schema=SCHEMA)
+    if impute:
+        config['imputation'] = _imputation_config()
+    text = json.dumps(config, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cache_path(path, cache_dir=CACHE_DIR, impute=False):
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = '{}-{}'.format(file_hash(path, cache_dir)[:16], config_hash(impute)[:8])
+    return os.path.join(cache_dir, '{}-{}.parquet'.format(name, key))
+
+
+def _has_parquet():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _clean_file(path, impute):
+    data = load_data(path)
+    imputer = fit_imputer(data) if impute else None
+    return clean(data, imputer=imputer)
+
+
+def _text_categories(data):
+    # the categories of the text columns in the default type of text, as
+    # read_parquet returns them, so a cleaned and a cached frame are equal
+    for column in data.columns:
+        dtype = data[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and dtype.categories.dtype == object:
+            categories = pd.Index(dtype.categories.tolist())
+            data[column] = pd.Categorical.from_codes(
+                data[column].cat.codes, dtype=pd.CategoricalDtype(categories, dtype.ordered))
+    return data
+
+
+def load_clean(path, cache_dir=CACHE_DIR, impute=False):
+    """Return the cleaned dataset, reading it from the cache when possible.
+
+    The cached Parquet file is keyed by the content of the source file and
+    by the cleaning configuration, so a new export or a change in any of
+    the cleaning steps makes the old copy unused. With `impute` the gaps
+    are first filled from the medians of similar listings, with an
+    imputer fitted on the raw file (imputation.fit_imputer), and the
+    result is cached apart. Without pyarrow the data is cleaned on every
+    call.
+    """
+    if not _has_parquet():
+        warnings.warn('pyarrow is not installed, the cleaned dataset is not cached')
+        return _text_categories(_clean_file(path, impute))
+
+    target = cache_path(path, cache_dir, impute)
+    if os.path.exists(target):
+        return _text_categories(pd.read_parquet(target))
+
+    data = _text_categories(_clean_file(path, impute))
+    # write under a temporary name first, so an interrupted run never
+    # leaves a broken cache file behind
+    partial = target + '.partial'
+    data.to_parquet(partial, index=False)
+    os.replace(partial, target)
+    return data
+
+
+def _outliers_hash():
+    text = json.dumps({'rules': OUTLIER_RULES, 'extremes': EXTREME_COLUMNS}, ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_correlations(path, method='pearson', by=None, cache_dir=CACHE_DIR):
+    """Correlations of all the numeric and derived columns of the cleaned file.
+
+    They are computed, as in the research, from the cleaned dataset
+    without the outliers (cleaning.filter_outliers) and with the derived
+    columns (features.add_features), for every value of `by` when given.
+    They are cached next to it under the same key and the one of the
+    outlier rules, so they are computed again only when the file, the
+    cleaning steps or the rules change.
+    """
+    def compute():
+        data, _ = filter_outliers(load_clean(path, cache_dir))
+        data = add_features(data)
+        if by is None:
+            return correlation_matrix(data, method=method)
+        return grouped_correlations(data, by, method=method)
+
+    if not _has_parquet():
+        return compute()
+    target = '{}-{}-corr-{}{}.parquet'.format(cache_path(path, cache_dir)[:-len('.parquet')],
+                                              _outliers_hash()[:8], method, '-' + by if by else '')
+    if os.path.exists(target):
+        return pd.read_parquet(target)
+    correlations = compute()
+    partial = target + '.partial'
+    correlations.to_parquet(partial)
+    os.replace(partial, target)
+    return correlations
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from .dtypes import downcast
+from .locality import LOCALITY_NAMES, normalize_locality_names
+
+
+# Bump it whenever a cleaning step changes its output, so that cached
+# copies of the cleaned dataset are rebuilt.
+CLEANING_VERSION = 3
+
+# Columns whose decimals do not make much sense, cast from float to int.
+SUPER_LIST = [
+    'parks_around3000',
+    'parks_nearest',
+    'ponds_around3000',
+    'ponds_nearest',
+    'last_price',
+    'ceiling_height',
+    'floors_total',
+    'living_area',
+    'total_area',
+    'kitchen_area',
+    'balcony',
+    'airports_nearest',
+    'cityCenters_nearest',
+    'days_exposition',
+]
+
+
+def fill_balcony(data):
+    # No balcony in the ad most probably means there is no balcony at all.
+    data['balcony'] = data['balcony'].fillna(0)
+    return data
+
+
+def filling(data, column, value=None):
+    # The median can be given, e.g. when it was computed over the whole
+    # file and the data comes in chunks.
+    x = data[column].median() if value is None else value
+    data[column] = data[column].fillna(x)
+    return data
+
+
+def round_columns(data, columns=None):
+    """Round the SUPER_LIST columns and make is_apartment a bool.
+
+    Only the columns without missing values are rounded, as the research
+    always did; `columns` restricts the rounding, e.g. to the columns that
+    have no missing values in the whole file when the data comes in parts.
+    The types are left as they are, see cast_types.
+    """
+    rounded = [column for column in (SUPER_LIST if columns is None else columns)
+               if not data[column].isna().any()]
+    if rounded:
+        data[rounded] = data[rounded].round()
+    data['is_apartment'] = data['is_apartment'].fillna(False).astype('bool')
+    return data
+
+
+def cast_types(data, columns=None):
+    """Round the SUPER_LIST columns and store every column in its smallest type.
+
+    The columns are rounded with round_columns, then dtypes.downcast
+    stores every column, with or without missing values, in the smallest
+    type that keeps its values. Returns the frame and the report of
+    downcast.
+    """
+    return downcast(round_columns(data, columns))
+
+
+def normalize_localities(data):
+    data['locality_name'] = normalize_locality_names(data['locality_name'])
+    return data
+
+
+# The limits chosen in the anomalies section of the research. A row is
+# removed when the value is below `lower` or above `upper` (None means no
+# limit); missing values never remove a row.
+OUTLIER_RULES = [
+    # rule, column, lower, upper
+    ('last_price > 30M', 'last_price', None, 30000000),
+    ('rooms > 7', 'rooms', None, 7),
+    ('ceiling_height < 2', 'ceiling_height', 2, None),
+    ('ceiling_height > 5', 'ceiling_height', None, 5),
+    ('living_area < 10', 'living_area', 10, None),
+    ('living_area > 150', 'living_area', None, 150),
+    ('kitchen_area < 5', 'kitchen_area', 5, None),
+    ('kitchen_area > 30', 'kitchen_area', None, 30),
+]
+
+# Columns whose single smallest and largest values are dropped first.
+EXTREME_COLUMNS = ['last_price']
+
+
+def _values(series):
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def filter_outliers(data, rules=None, extremes=None):
+    """Remove the anomalies in a single pass over the frame.
+
+    All rules are evaluated into one boolean mask and the frame is copied
+    once. Returns the filtered frame and a report with, for every rule,
+    the rows it matches and the rows it removed that no earlier rule did.
+    """
+    if rules is None:
+        rules = OUTLIER_RULES
+    if extremes is None:
+        extremes = EXTREME_COLUMNS
+
+    names, columns, masks = [], [], []
+    for column in extremes:
+        values = _values(data[column])
+        mask = np.zeros(len(data), dtype=bool)
+        if not np.isnan(values).all():
+            mask[[np.nanargmin(values), np.nanargmax(values)]] = True
+        names.append('{} min and max'.format(column))
+        columns.append(column)
+        masks.append(mask)
+    for rule, column, lower, upper in rules:
+        values = _values(data[column])
+        mask = np.zeros(len(data), dtype=bool)
+        if lower is not None:
+            mask |= values < lower
+        if upper is not None:
+            mask |= values > upper
+        names.append(rule)
+        columns.append(column)
+        masks.append(mask)
+
+    masks = np.array(masks).reshape(len(masks), len(data))
+    matched = masks.sum(axis=1)
+    # a row is counted for the first rule that removes it
+    first = masks & (np.cumsum(masks, axis=0) == 1)
+    removed = first.sum(axis=1)
+    outliers = masks.any(axis=0)
+
+    report = pd.DataFrame(
+        {'column': columns, 'matched': matched, 'removed': removed},
+        index=pd.Index(names, name='rule'),
+    )
+    report.loc['total'] = ['', outliers.sum(), outliers.sum()]
+    report['percent'] = report['removed'] / max(len(data), 1) * 100
+
+    filtered = data[~outliers]
+    filtered.index = pd.RangeIndex(len(filtered))
+    return filtered, report
+
+
+def clean(data, ceiling_height=None, cast_columns=None, imputer=None, cast=True):
+    """Run all the preprocessing steps of the research on a raw frame.
+
+    `ceiling_height` is the value used for the missing ceiling heights,
+    the median of the frame by default, and `cast_columns` the columns
+    rounded (see cast_types). A fitted imputation.GroupMedianImputer
+    given as `imputer` (see imputation.fit_imputer) fills its columns
+    from the medians of similar listings first; what it leaves is filled
+    as usual. With `cast` False the columns are rounded but keep their
+    types, for parts of a file that are downcast once put together.
+    """
+    fill_balcony(data)
+    normalize_localities(data)
+    if imputer is not None:
+        imputer.transform(data)
+    filling(data, 'ceiling_height', ceiling_height)
+    if not cast:
+        return round_columns(data, cast_columns)
+    data, _ = cast_types(data, cast_columns)
+    return data
+
+
+def cleaning_config():
+    # Everything that decides what the cleaned dataset looks like.
+    return {
+        'version': CLEANING_VERSION,
+        'super_list': SUPER_LIST,
+        'locality_names': LOCALITY_NAMES,
+    }
@@ -0,0 +1,178 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .locality import LocalityIndex
+
+
+# Numeric features of a listing and the floor category, compared after
+# scaling every one by its standard deviation.
+COMP_FEATURES = ['total_area', 'rooms', 'km_to_center', 'ceiling_height']
+COMP_CATEGORIES = ['floor_apartment']
+
+K = 10
+
+# Number of distances computed at a time, queries x listings.
+BLOCK_SIZE = 1 << 22
+
+
+def _fill(matrix, rows, medians):
+    # missing features of the rows take the medians
+    part = matrix[rows]
+    missing = np.isnan(part)
+    if missing.any():
+        part[missing] = np.broadcast_to(medians, part.shape)[missing]
+        matrix[rows] = part
+
+
+class CompsIndex:
+    """The most similar listings of the same locality, for many listings at once.
+
+    The features are scaled once, when the index is built: the numeric
+    ones by their standard deviation, the floor category as indicator
+    columns, so a different category counts as much as one standard
+    deviation. Missing values take the median of the locality. Listings
+    are only compared with the listings of their locality (the index of
+    LocalityIndex), or with all of them when the locality is unknown.
+    The queries of a locality are answered together, block by block, with
+    a matrix product of the queries and the listings and a partial sort
+    of every row.
+    """
+
+    def __init__(self, data, features=None, categories=None, weights=None):
+        self.features = list(COMP_FEATURES if features is None else features)
+        self.categories = list(COMP_CATEGORIES if categories is None else categories)
+        self.weights = weights or {}
+        self.data = data
+
+        numeric = np.column_stack([data[column].to_numpy(dtype='float64', na_value=np.nan)
+                                   for column in self.features])
+        self.scale = np.nanstd(numeric, axis=0)
+        self.scale[~(self.scale > 0)] = 1
+        self.levels = {column: data[column].astype('category').cat.categories
+                       for column in self.categories}
+
+        self.localities = LocalityIndex(data['locality_name'])
+        self.matrix = self._matrix(data)
+        # medians of the features in every locality, for the missing values
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.overall = np.nanmedian(self.matrix, axis=0)
+            self.medians = np.array([
+                np.nanmedian(self.matrix[self._candidates(number)], axis=0)
+                for number in range(len(self.localities.names))
+            ]).reshape(-1, self.matrix.shape[1])
+        self.medians = np.where(np.isnan(self.medians), self.overall, self.medians)
+        for number in range(len(self.localities.names)):
+            _fill(self.matrix, self._candidates(number), self.medians[number])
+        _fill(self.matrix, np.arange(len(data)), self.overall)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    def _candidates(self, number):
+        # positions of the listings of the locality number `number`
+        return self.localities.order[self.localities.bounds[number]:
+                                     self.localities.bounds[number + 1]]
+
+    def _matrix(self, data):
+        numeric = np.column_stack([data[column].to_numpy(dtype='float64', na_value=np.nan)
+                                   for column in self.features]) / self.scale
+        numeric *= [self.weights.get(column, 1) for column in self.features]
+        parts = [numeric]
+        for column, levels in self.levels.items():
+            codes = levels.get_indexer(data[column].astype(object))
+            indicators = np.zeros((len(data), len(levels)))
+            known = codes >= 0
+            # two different categories are at a distance of 1
+            indicators[np.flatnonzero(known), codes[known]] = (
+                np.sqrt(0.5) * self.weights.get(column, 1))
+            parts.append(indicators)
+        return np.hstack(parts)
+
+    def _nearest(self, queries, candidates, k):
+        # positions in `candidates` and distances of the k nearest listings
+        # of every query, from the nearest
+        k = min(k, len(candidates))
+        points = self.matrix[candidates]
+        norms = self.norms[candidates]
+        block = max(1, BLOCK_SIZE // max(len(candidates), 1))
+        found = np.empty((len(queries), k), dtype='int64')
+        distances = np.empty((len(queries), k))
+        for start in range(0, len(queries), block):
+            part = queries[start:start + block]
+            squared = (np.einsum('ij,ij->i', part, part)[:, None] + norms[None, :]
+                       - 2 * part @ points.T)
+            nearest = np.argpartition(squared, k - 1, axis=1)[:, :k] if k < len(candidates) \
+                else np.tile(np.arange(len(candidates)), (len(part), 1))
+            nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+            order = np.argsort(nearest_squared, axis=1, kind='stable')
+            found[start:start + len(part)] = np.take_along_axis(nearest, order, axis=1)
+            distances[start:start + len(part)] = np.sqrt(np.maximum(
+                np.take_along_axis(nearest_squared, order, axis=1), 0))
+        return candidates[found], distances
+
+    def query(self, data, k=K, exclude_self=False):
+        """The k comparable listings of every listing of `data`.
+
+        Returns a long frame with the label of the listing, the rank of
+        the comparable listing (0 is the nearest), its position and label
+        in the frame of the index and the distance. With `exclude_self`
+        a listing of the indexed frame is not its own comparable.
+        """
+        matrix = self._matrix(data)
+        queries = LocalityIndex(data['locality_name'])
+        numbers = self.localities.names.get_indexer(queries.names)
+        everything = np.arange(len(self.data))
+        known = np.zeros(len(data), dtype=bool)
+
+        extra = 1 if exclude_self else 0
+        width = k + extra
+        positions = np.full((len(data), width), -1, dtype='int64')
+        distances = np.full((len(data), width), np.nan)
+        groups = []
+        for query_number, number in enumerate(numbers):
+            if number < 0:
+                continue
+            rows = queries.order[queries.bounds[query_number]:queries.bounds[query_number + 1]]
+            known[rows] = True
+            _fill(matrix, rows, self.medians[number])
+            groups.append((rows, self._candidates(number)))
+        rows = np.flatnonzero(~known)
+        if len(rows):
+            _fill(matrix, rows, self.overall)
+            groups.append((rows, everything))
+
+        for rows, candidates in groups:
+            found, found_distances = self._nearest(matrix[rows], candidates, width)
+            positions[rows, :found.shape[1]] = found
+            distances[rows, :found.shape[1]] = found_distances
+
+        labels = np.repeat(np.asarray(data.index), width)
+        ranks = np.tile(np.arange(width), len(data))
+        comps = pd.DataFrame({
+            'listing': labels,
+            'rank': ranks,
+            'position': positions.ravel(),
+            'distance': distances.ravel(),
+        })
+        comps = comps[comps['position'] >= 0]
+        comps['comp'] = np.asarray(self.data.index)[comps['position']]
+        if exclude_self:
+            comps = comps[comps['comp'].to_numpy() != comps['listing'].to_numpy()]
+            comps['rank'] = comps.groupby('listing', sort=False).cumcount()
+            comps = comps[comps['rank'] < k]
+        return comps.reset_index(drop=True)
+
+    def comps(self, listing, k=K):
+        """The rows of the k listings most similar to one listing, with the distance."""
+        found = self.query(pd.DataFrame([listing]), k)
+        comps = self.data.take(found['position'].to_numpy())
+        return comps.assign(distance=found['distance'].to_numpy())
+
+    def value(self, data, column='price_per_meter', k=K, exclude_self=False):
+        """Median of `column` over the comparable listings of every listing."""
+        found = self.query(data, k, exclude_self=exclude_self)
+        values = self.data[column].to_numpy(dtype='float64', na_value=np.nan)
+        found['value'] = values[found['position'].to_numpy()]
+        medians = found.groupby('listing', sort=False)['value'].median()
+        return medians.reindex(data.index).rename(column)
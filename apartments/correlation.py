@@ -0,0 +1,115 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+METHODS = ['pearson', 'spearman']
+
+
+def numeric_columns(data):
+    return [column for column in data.columns
+            if pd.api.types.is_numeric_dtype(data[column].dtype)
+            and not pd.api.types.is_bool_dtype(data[column].dtype)]
+
+
+def _correlate(left, right):
+    # Pearson correlation of every column of `left` with every column of
+    # `right`, rows without missing values, as one centered product
+    left = left - left.mean(axis=0)
+    right = right - right.mean(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (left.T @ right) / np.outer(np.sqrt((left ** 2).sum(axis=0)),
+                                           np.sqrt((right ** 2).sum(axis=0)))
+
+
+def _rank(values):
+    # average ranks of every column, as scipy.stats.rankdata
+    return pd.DataFrame(values).rank(method='average').to_numpy()
+
+
+def _pearson(values, known):
+    # Pearson of every pair on the rows where both are known, from four
+    # products of the centered values and of the masks of known values
+    mask = known.astype('float64')
+    with warnings.catch_warnings():
+        # a column without known values has no mean
+        warnings.simplefilter('ignore', RuntimeWarning)
+        centered = np.where(known, values - np.nanmean(values, axis=0), 0)
+    count = mask.T @ mask
+    sums = centered.T @ mask
+    squares = (centered ** 2).T @ mask
+    products = centered.T @ centered
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = products - sums * sums.T / count
+        variance = squares - sums ** 2 / count
+        return covariance / np.sqrt(variance * variance.T), count
+
+
+def _spearman(values, known):
+    # Spearman needs the ranks on the rows where both columns are known.
+    # The columns are grouped by the rows where they are missing, and for
+    # every two groups all their pairs come from one product of the ranks
+    # on the rows both groups know
+    patterns = {}
+    for number in range(values.shape[1]):
+        patterns.setdefault(np.packbits(known[:, number]).tobytes(), []).append(number)
+    groups = list(patterns.values())
+
+    result = np.full((values.shape[1], values.shape[1]), np.nan)
+    for first, left in enumerate(groups):
+        for right in groups[first:]:
+            rows = known[:, left[0]] & known[:, right[0]]
+            if rows.sum() < 2:
+                continue
+            part = values[rows]
+            block = _correlate(_rank(part[:, left]), _rank(part[:, right]))
+            result[np.ix_(left, right)] = block
+            result[np.ix_(right, left)] = block.T
+    mask = known.astype('float64')
+    return result, mask.T @ mask
+
+
+def correlation_matrix(data, columns=None, method='pearson', min_periods=1):
+    """Pearson or Spearman correlation of every pair of columns.
+
+    Like DataFrame.corr, every pair uses the rows where both columns are
+    known, but all the pairs come from a few matrix products of the
+    centered values instead of one pass per pair. Pairs with less than
+    `min_periods` rows are NaN.
+    """
+    if method not in METHODS:
+        raise ValueError('unknown method: {}'.format(method))
+    columns = numeric_columns(data) if columns is None else list(columns)
+    values = np.column_stack([data[column].to_numpy(dtype='float64', na_value=np.nan)
+                              for column in columns]) if columns else np.zeros((len(data), 0))
+    known = ~np.isnan(values)
+
+    result, count = (_pearson if method == 'pearson' else _spearman)(values, known)
+    result[count < max(min_periods, 2)] = np.nan
+    # a column is always perfectly correlated with itself, as in pandas
+    diagonal = np.diag(result).copy()
+    np.fill_diagonal(result, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return pd.DataFrame(result, index=columns, columns=columns)
+
+
+def grouped_correlations(data, by, columns=None, method='pearson', min_periods=1):
+    """correlation_matrix for every value of `by`, e.g. the locality or the year.
+
+    Returns one frame indexed by the value and the column, like
+    data.groupby(by).corr().
+    """
+    columns = [column for column in (numeric_columns(data) if columns is None else columns)
+               if column != by]
+    codes, keys = pd.factorize(data[by], sort=True)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0],
+                                                        minlength=len(keys)))])
+    order = order[np.count_nonzero(codes < 0):]
+    tables = {}
+    for number, key in enumerate(keys):
+        rows = order[bounds[number]:bounds[number + 1]]
+        tables[key] = correlation_matrix(data.iloc[rows], columns, method, min_periods)
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(tables, names=[by, None])
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+
+# Integer types from the smallest, with the nullable type used when the
+# column has missing values.
+INT_TYPES = [
+    ('int8', 'Int8'),
+    ('int16', 'Int16'),
+    ('int32', 'Int32'),
+    ('int64', 'Int64'),
+]
+
+# Text columns with at most this share of distinct values become categories.
+CATEGORY_SHARE = 0.5
+
+# Decimals tried when checking that float32 keeps the values of a column.
+MAX_DECIMALS = 6
+
+
+def _float32_keeps(values):
+    # float32 keeps the values as they were written in the file: with the
+    # same number of decimals, they round back to the same numbers
+    if np.abs(values).max() > np.finfo('float32').max:
+        return False
+    single = values.astype('float32').astype('float64')
+    if (single == values).all():
+        return True
+    for decimals in range(1, MAX_DECIMALS + 1):
+        if (np.round(values, decimals) == values).all():
+            return bool((np.round(single, decimals) == values).all())
+    return False
+
+
+def _nbytes(dtype, rows):
+    # memory of a numeric column of this type, with the mask of the
+    # nullable types
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return rows * (dtype.numpy_dtype.itemsize + 1)
+    return rows * dtype.itemsize
+
+
+def target_dtype(series):
+    """The smallest type that keeps every value of the column.
+
+    Whole numbers go to the smallest integer type, nullable when the
+    column has missing values; other floats go to float32 when it keeps
+    them; booleans without missing values to bool; text with few distinct
+    values to category. A numeric type is only chosen when it takes less
+    memory than the current one. None means the column stays as it is.
+    """
+    dtype = series.dtype
+    rows = len(series)
+    missing = int(series.isna().sum())
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool' if not missing and dtype != np.dtype('bool') else None
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+        return None
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if rows and series.nunique() <= CATEGORY_SHARE * rows:
+            return 'category'
+        return None
+    if not pd.api.types.is_numeric_dtype(dtype):
+        return None
+
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    candidate = None
+    if (values == np.round(values)).all():
+        low, high = values.min(), values.max()
+        for plain, nullable in INT_TYPES:
+            limits = np.iinfo(plain)
+            if limits.min <= low and high <= limits.max:
+                candidate = nullable if missing else plain
+                break
+    if candidate is None and _float32_keeps(values):
+        candidate = 'float32'
+    if candidate is None:
+        return None
+    candidate = pd.api.types.pandas_dtype(candidate)
+    if candidate == dtype or _nbytes(candidate, rows) >= _nbytes(dtype, rows):
+        return None
+    return candidate
+
+
+def downcast(data, columns=None):
+    """Store every column in the smallest type that keeps its values.
+
+    The types are chosen with target_dtype and all the converted columns
+    are assigned at once. Returns the frame and a report with the old and
+    the new type and the memory of every converted column, and a total.
+    """
+    columns = list(data.columns if columns is None else columns)
+    targets = {}
+    for column in columns:
+        dtype = target_dtype(data[column])
+        if dtype is not None:
+            targets[column] = dtype
+
+    before = data[list(targets)].memory_usage(index=False, deep=True)
+    old = data[list(targets)].dtypes.astype(str)
+    converted = {}
+    for column, dtype in targets.items():
+        series = data[column]
+        if isinstance(dtype, np.dtype) and dtype.kind in 'iu' and series.dtype.kind == 'f':
+            # float to int without missing values, the values are whole already
+            converted[column] = series.to_numpy().astype(dtype)
+        else:
+            converted[column] = series.astype(dtype)
+    if converted:
+        data[list(converted)] = pd.DataFrame(converted, index=data.index)
+    after = data[list(targets)].memory_usage(index=False, deep=True)
+
+    report = pd.DataFrame({
+        'from': old,
+        'to': data[list(targets)].dtypes.astype(str),
+        'bytes_before': before,
+        'bytes_after': after,
+    }, index=pd.Index(list(targets), name='column'))
+    report.loc['total'] = ['', '', before.sum(), after.sum()]
+    report['saved'] = report['bytes_before'] - report['bytes_after']
+    return data, report
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from .locality import CITY, LocalityIndex
+
+
+def first_floor(floor, floors_total):
+    return floor == 1
+
+
+def last_floor(floor, floors_total):
+    return floor == floors_total
+
+
+def penultimate_floor(floor, floors_total):
+    return floor == floors_total - 1
+
+
+def high_rise(floor, floors_total):
+    return floor > 16
+
+
+# Floor categories in order of priority: an apartment gets the first rule
+# that matches it and 'other' when none does. A rule receives the floor
+# and floors_total columns as float arrays, NaN where they are missing,
+# and returns a boolean array. More categories are added by extending the
+# list, e.g. with ('penultimate_floor', penultimate_floor) or
+# ('high_rise', high_rise).
+FLOOR_RULES = [
+    ('first_floor', first_floor),
+    ('last_floor', last_floor),
+]
+
+
+def floor_categories(data, rules=None, default='other'):
+    """Classify every apartment by its floor, without a row by row apply."""
+    if rules is None:
+        rules = FLOOR_RULES
+    floor = data['floor'].to_numpy(dtype='float64', na_value=np.nan)
+    floors_total = data['floors_total'].to_numpy(dtype='float64', na_value=np.nan)
+
+    names = [name for name, _ in rules]
+    conditions = [np.asarray(rule(floor, floors_total), dtype=bool) for _, rule in rules]
+    codes = np.select(conditions, np.arange(len(names)), default=len(names))
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=names + [default]),
+        index=data.index,
+        name='floor_apartment',
+    )
+
+
+def add_features(data):
+    """Add the columns the research analysis is built on."""
+    data['price_per_meter'] = data['last_price'] / data['total_area']
+
+    data['day'] = data['first_day_exposition'].dt.weekday
+    data['month'] = data['first_day_exposition'].dt.month
+    data['year'] = data['first_day_exposition'].dt.year
+
+    data['floor_apartment'] = floor_categories(data)
+
+    # distances in km for better reading
+    data['km_to_center'] = (data['cityCenters_nearest'] / 1000).round()
+    data['km_to_airports'] = (data['airports_nearest'] / 1000).round()
+    return data
+
+
+def price_gradient(data, value='last_price', by='km_to_center', locality=CITY,
+                   group=None, aggfunc='mean', localities=None):
+    """How much the price changes with every kilometer of distance.
+
+    `value` is aggregated for every distance (and for every value of the
+    `group` column, if given) and compared with the next distance of the
+    same group: km_price is the price at this distance minus the price at
+    the next one, divided by the kilometers between them. Only the ads of
+    `locality` are used; None takes all of them, and `localities` is a
+    LocalityIndex of the data to select them with, built when not given.
+    Returns a flat frame sorted by the group and the distance.
+    """
+    if locality is not None:
+        if localities is None:
+            localities = LocalityIndex(data['locality_name'])
+        data = localities.select(data, locality)
+    keys = [by] if group is None else [group, by]
+
+    table = (data.groupby(keys, observed=True, sort=True)[value]
+             .agg(aggfunc)
+             .reset_index())
+    if group is None:
+        following = table[[by, value]].shift(-1)
+    else:
+        following = table.groupby(group, observed=True)[[by, value]].shift(-1)
+    table['km_price'] = (table[value] - following[value]) / (following[by] - table[by])
+    return table
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+
+# Columns with at most this many distinct values keep the count of every
+# value, and any histogram of them is exact.
+MAX_DISTINCT = 1 << 16
+
+# Number of equal bins between the minimum and the maximum of the other
+# columns. A value is then known to half a fine bin.
+FINE_BINS = 1 << 14
+
+
+class HistogramStore:
+    """Counts of the values of every numeric column, for any histogram.
+
+    The counts are computed once per column: the count of every distinct
+    value when there are few of them, else the counts of FINE_BINS equal
+    bins. A histogram with any bins and range is then a weighted
+    histogram of these points, whose cost depends on the number of
+    distinct values or fine bins and not on the number of rows. The
+    store is a snapshot of the frame: build a new one after changing it.
+    """
+
+    def __init__(self, data, columns=None, max_distinct=MAX_DISTINCT, fine_bins=FINE_BINS):
+        if columns is None:
+            columns = [column for column in data.columns
+                       if pd.api.types.is_numeric_dtype(data[column].dtype)
+                       and not pd.api.types.is_bool_dtype(data[column].dtype)]
+        self.points = {}
+        self.counts = {}
+        self.limits = {}
+        self.exact = {}
+        for column in columns:
+            values = data[column].to_numpy(dtype='float64', na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if not len(values):
+                points, counts = np.zeros(0), np.zeros(0, dtype='int64')
+                self.limits[column] = (0.0, 1.0)
+                self.exact[column] = True
+            else:
+                low, high = values.min(), values.max()
+                self.limits[column] = (low, high)
+                points, counts = np.unique(values, return_counts=True)
+                self.exact[column] = len(points) <= max_distinct
+                if not self.exact[column]:
+                    counts, edges = np.histogram(values, bins=fine_bins, range=(low, high))
+                    points = (edges[:-1] + edges[1:]) / 2
+            self.points[column] = points
+            self.counts[column] = counts
+
+    @property
+    def columns(self):
+        return list(self.points)
+
+    def histogram(self, column, bins=10, range=None):
+        """Counts and edges of the bins, as numpy.histogram of the column."""
+        if range is None:
+            range = self.limits[column]
+        return np.histogram(self.points[column], bins=bins, range=range,
+                            weights=self.counts[column])
+
+    def plot(self, column, bins=10, range=None, ax=None, figsize=None, grid=True, **kwargs):
+        """Draw the histogram, like data.hist(column, bins=..., range=...)."""
+        if ax is None:
+            import matplotlib.pyplot as plt
+            _, ax = plt.subplots(figsize=figsize)
+        counts, edges = self.histogram(column, bins, range)
+        ax.hist(edges[:-1], bins=edges, weights=counts, **kwargs)
+        ax.set_title(column)
+        ax.grid(grid)
+        return ax
+
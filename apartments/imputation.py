@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from .aggregation import Breakdowns, group_medians
+from .baseline import _key_frame
+from .cleaning import fill_balcony, normalize_localities
+
+
+# Columns filled from the medians of similar listings.
+IMPUTE_COLUMNS = [
+    'ceiling_height',
+    'living_area',
+    'kitchen_area',
+    'floors_total',
+    'airports_nearest',
+    'cityCenters_nearest',
+    'parks_nearest',
+    'ponds_nearest',
+]
+
+# Height of the building: up to 5, 9, 16 floors and higher, as in the
+# usual series of the city's houses.
+FLOORS_BANDS = [1, 6, 10, 17, np.inf]
+
+# Groups from the most to the least specific. A value is filled from the
+# first group that has enough known values; the last one is the whole
+# data, the median that filling() uses.
+IMPUTE_LEVELS = [
+    ['locality_name', 'rooms', 'floors_band'],
+    ['locality_name', 'rooms'],
+    ['locality_name'],
+    [],
+]
+
+# The distances only make sense inside a locality: a village without any
+# known distance is not given the ones of the city.
+LOCAL_COLUMNS = [
+    'airports_nearest',
+    'cityCenters_nearest',
+    'parks_nearest',
+    'ponds_nearest',
+]
+
+MIN_COUNT = 5
+
+
+def floors_bands(floors_total, bands=None):
+    if bands is None:
+        bands = FLOORS_BANDS
+    return pd.cut(floors_total.astype('float64'), bands, right=False)
+
+
+def imputation_keys(data):
+    """The columns that define the groups of every listing."""
+    return pd.DataFrame({
+        'locality_name': data['locality_name'],
+        'rooms': data['rooms'],
+        'floors_band': floors_bands(data['floors_total']),
+    }, index=data.index)
+
+
+class GroupMedianImputer:
+    """Fill missing values with the median of similar listings.
+
+    `fit` computes the median of every column for every group of every
+    level in one sort per column and level, and keeps them in lookup
+    tables. `transform` fills a frame, the one it was fitted on or a new
+    batch, from these tables without computing any median again. A
+    listing whose group is unknown or has less than `min_count` values
+    falls back to the next level, except for `local_columns` which are
+    only filled from levels grouped by locality_name. A missing
+    floors_total has no band, so it is always filled from the locality and
+    rooms level or a coarser one.
+    """
+
+    def __init__(self, columns=None, levels=None, local_columns=None, min_count=MIN_COUNT):
+        self.columns = list(IMPUTE_COLUMNS if columns is None else columns)
+        self.levels = [list(level) for level in (IMPUTE_LEVELS if levels is None else levels)]
+        self.local_columns = set(LOCAL_COLUMNS if local_columns is None else local_columns)
+        self.min_count = min_count
+        self.tables = None
+
+    def fit(self, data):
+        keys = imputation_keys(data)
+        breakdowns = Breakdowns(keys)
+        values = {column: data[column].to_numpy(dtype='float64', na_value=np.nan)
+                  for column in self.columns}
+
+        self.tables = []
+        for level in self.levels:
+            if level:
+                codes, groups = breakdowns.codes(level)
+                codes = codes.astype('int64')
+                index = pd.MultiIndex.from_frame(
+                    _key_frame(groups.to_frame(index=False), level))
+            else:
+                codes = np.zeros(len(data), dtype='int64')
+                index = pd.RangeIndex(1)
+            table = {}
+            for column in self.columns:
+                if column in self.local_columns and 'locality_name' not in level:
+                    table[column] = np.full(len(index), np.nan)
+                    continue
+                medians, counts = group_medians(codes, values[column], len(index))
+                table[column] = np.where(counts >= self.min_count, medians, np.nan)
+            self.tables.append(pd.DataFrame(table, index=index))
+        return self
+
+    def fill_values(self, data):
+        """The value every missing cell of `data` would be filled with."""
+        if self.tables is None:
+            raise ValueError('the imputer is not fitted')
+        keys = imputation_keys(data)
+        n = len(data)
+        fills = {column: np.full(n, np.nan) for column in self.columns}
+        for level, table in zip(self.levels, self.tables):
+            if level:
+                rows = table.index.get_indexer(pd.MultiIndex.from_frame(_key_frame(keys, level)))
+            else:
+                rows = np.zeros(n, dtype='int64')
+            known = rows >= 0
+            for column in self.columns:
+                pending = np.isnan(fills[column]) & known
+                fills[column][pending] = table[column].to_numpy()[rows[pending]]
+        return pd.DataFrame(fills, index=data.index)
+
+    def transform(self, data):
+        fills = self.fill_values(data)
+        for column in self.columns:
+            fill = fills[column]
+            if pd.api.types.is_integer_dtype(data[column].dtype):
+                fill = fill.round()
+            data[column] = data[column].fillna(fill)
+        return data
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+
+def fit_imputer(data, **options):
+    """Fit a GroupMedianImputer on a raw frame, as load_data returns it.
+
+    The groups must be the ones clean() sees when it calls `transform`:
+    the balconies filled and the locality names normalized, but nothing
+    else filled or rounded yet. This is done on a copy, `data` is left
+    as it is. `options` are passed to GroupMedianImputer.
+    """
+    data = normalize_localities(fill_balcony(data.copy()))
+    return GroupMedianImputer(**options).fit(data)
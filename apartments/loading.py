@@ -0,0 +1,87 @@
+import pandas as pd
+
+
+# Explicit dtypes for every column of the Yandex Real Estate export, so that
+# nothing has to be inferred and nothing is loaded as float64 without need.
+# Counters are nullable small ints (the archive has gaps in all of them),
+# distances in meters fit float32 exactly, prices and areas stay float64.
+SCHEMA = {
+    'total_images': 'Int8',
+    'last_price': 'float64',
+    'total_area': 'float64',
+    'rooms': 'Int8',
+    'ceiling_height': 'float64',
+    'floors_total': 'Int8',
+    'living_area': 'float64',
+    'floor': 'Int8',
+    'is_apartment': 'boolean',
+    'studio': 'bool',
+    'open_plan': 'bool',
+    'kitchen_area': 'float64',
+    'balcony': 'Int8',
+    'locality_name': 'category',
+    'airports_nearest': 'float32',
+    'cityCenters_nearest': 'float32',
+    'parks_around3000': 'Int8',
+    'parks_nearest': 'float32',
+    'ponds_around3000': 'Int8',
+    'ponds_nearest': 'float32',
+    'days_exposition': 'float32',
+}
+
+DATE_COLUMNS = ['first_day_exposition']
+
+# The type read_csv gives the parsed dates (ns before pandas 3, us since),
+# also used for a date column without any value, which it leaves as text.
+DATE_DTYPE = pd.to_datetime(pd.Series(['2019-03-07T00:00:00'])).dtype
+
+# pandas parses nullable integers from text much slower than floats, so
+# they are read as floats and converted once the column is parsed.
+_PARSE_AS = {'Int8': 'float32'}
+
+COLUMNS = [
+    'total_images', 'last_price', 'total_area', 'first_day_exposition', 'rooms',
+    'ceiling_height', 'floors_total', 'living_area', 'floor', 'is_apartment',
+    'studio', 'open_plan', 'kitchen_area', 'balcony', 'locality_name',
+    'airports_nearest', 'cityCenters_nearest', 'parks_around3000', 'parks_nearest',
+    'ponds_around3000', 'ponds_nearest', 'days_exposition',
+]
+
+
+def load_data(path, usecols=None, sep='\t', **kwargs):
+    """Read the listings file with the explicit schema applied at parse time.
+
+    Only the columns in `usecols` are parsed (all of them by default) and
+    first_day_exposition is converted to datetime while reading. Any other
+    keyword, e.g. chunksize or nrows, is passed to pd.read_csv.
+    """
+    if usecols is None:
+        usecols = COLUMNS
+    usecols = list(usecols)
+    unknown = [column for column in usecols if column not in COLUMNS]
+    if unknown:
+        raise ValueError('unknown columns: {}'.format(', '.join(unknown)))
+
+    dtype = {column: SCHEMA[column] for column in usecols if column in SCHEMA}
+    convert = {column: dtype[column] for column in dtype if dtype[column] in _PARSE_AS}
+    dates = [column for column in DATE_COLUMNS if column in usecols]
+
+    def finish(data):
+        for column, target in convert.items():
+            data[column] = data[column].astype(target)
+        for column in dates:
+            if not pd.api.types.is_datetime64_dtype(data[column].dtype):
+                data[column] = pd.to_datetime(data[column]).astype(DATE_DTYPE)
+        return data
+
+    data = pd.read_csv(
+        path,
+        sep=sep,
+        usecols=usecols,
+        dtype={column: _PARSE_AS.get(kind, kind) for column, kind in dtype.items()},
+        parse_dates=dates,
+        **kwargs
+    )
+    if kwargs.get('chunksize'):
+        return (finish(chunk) for chunk in data)
+    return finish(data)
@@ -0,0 +1,114 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# The city most of the ads are from.
+CITY = 'Санкт-Петербург'
+
+# Words that turn the same locality into an implicit duplicate, e.g.
+# "поселок Мурино" and "посёлок Мурино". The order matters: every word is
+# removed once, in this order, exactly as the original cleanup loop did.
+LOCALITY_NAMES = [
+    'поселок', 'посёлок', 'городского типа', 'городской', 'коттеджный', 'станции',
+    'при железнодорожной', 'садовое товарищество', 'садоводческое некоммерческое товарищество',
+    'деревня', 'село',
+]
+
+
+def _strip_names(values, names, pattern):
+    # Only the values containing at least one of the words need any work.
+    values = pd.Series(values, dtype=object)
+    touched = values[values.str.contains(pattern, na=False)]
+    for x in names:
+        mask = touched.str.contains(x, regex=False)
+        if mask.any():
+            touched[mask] = (touched[mask]
+                             .str.replace(x, '', n=1, regex=False)
+                             .str.lstrip())
+    values[touched.index] = touched
+    return values
+
+
+def normalize_locality_names(series, names=None):
+    """Remove settlement type words from the locality names.
+
+    The words are stripped from the unique values only and the result is
+    mapped back to the rows through categorical codes, so the cost depends
+    on the number of distinct localities, not on the number of ads.
+    Returns a categorical series; missing values stay missing.
+    """
+    if names is None:
+        names = LOCALITY_NAMES
+    pattern = re.compile('|'.join(re.escape(x) for x in names))
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories.to_numpy(dtype=object)
+    else:
+        codes, uniques = pd.factorize(series)
+        uniques = np.asarray(uniques, dtype=object)
+
+    cleaned = _strip_names(uniques, names, pattern)
+    new_codes, categories = pd.factorize(cleaned)
+    # -1 (missing) has to stay -1 after remapping
+    remap = np.append(new_codes, -1)
+    codes = remap[codes]
+
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=series.index,
+        name=series.name,
+    )
+
+
+class LocalityIndex:
+    """Positions of the rows of every locality, in order.
+
+    The rows are sorted once by the category codes of the column and the
+    positions of every locality are kept as one slice of this order, so
+    selecting a locality is a slice instead of a comparison of every name.
+    Missing names belong to no locality. The index is a snapshot of the
+    column: build a new one after changing it.
+    """
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            names = series.cat.categories
+        else:
+            codes, names = pd.factorize(series, sort=True)
+        self.rows = len(series)
+        self.names = pd.Index(names, name=series.name)
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.names))
+        self.bounds = np.concatenate([[0], np.cumsum(counts)])
+        order = np.argsort(codes, kind='stable')
+        self.order = order[np.count_nonzero(codes < 0):]
+
+    def counts(self):
+        return pd.Series(np.diff(self.bounds), index=self.names)
+
+    def positions(self, localities):
+        """Sorted positions of the rows of one locality or a list of them."""
+        if isinstance(localities, str) or np.ndim(localities) == 0:
+            localities = [localities]
+        numbers = self.names.get_indexer(list(localities))
+        parts = [self.order[self.bounds[i]:self.bounds[i + 1]] for i in numbers[numbers >= 0]]
+        if not parts:
+            return np.zeros(0, dtype='int64')
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def mask(self, localities):
+        mask = np.zeros(self.rows, dtype=bool)
+        mask[self.positions(localities)] = True
+        return mask
+
+    def select(self, data, localities):
+        """The rows of `data` in the localities, like data.query('locality_name == ...')."""
+        return data.take(self.positions(localities))
+
+    def exclude(self, data, localities):
+        """The other rows, including the ones without a locality, like `!=`."""
+        return data[~self.mask(localities)]
+
@@ -0,0 +1,203 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from .baseline import _plain
+
+
+# Numeric features of the model, every one with an indicator of the
+# listings where it is missing, so that no listing is dropped.
+NUMERIC_FEATURES = ['total_area', 'rooms', 'km_to_center', 'ceiling_height', 'kitchen_area',
+                    'floors_total']
+
+# Features with one coefficient for every value (one-hot).
+CATEGORICAL_FEATURES = ['locality_name', 'floor_apartment', 'year']
+
+# Strength of the ridge penalty. A value of a categorical feature seen in
+# n listings has its coefficient shrunk by n / (n + ALPHA), the numeric
+# features are penalized by ALPHA times their variance per listing.
+ALPHA = 10.0
+
+MODEL_VERSION = 1
+
+
+class HedonicModel:
+    """Ridge regression of the price per meter on the listing features.
+
+    The model keeps the sufficient statistics of the normal equations,
+    X'X and X'y, not the data, so new sales are added with `update`
+    and the coefficients solved again from the sums. The one-hot blocks
+    are never built: their products with the numeric columns, the target
+    and each other are bincounts of the category codes. A category seen
+    for the first time adds a row and a column of zeros to the sums.
+    """
+
+    def __init__(self, numeric=None, categorical=None, target='price_per_meter', alpha=ALPHA):
+        self.numeric = list(NUMERIC_FEATURES if numeric is None else numeric)
+        self.categorical = list(CATEGORICAL_FEATURES if categorical is None else categorical)
+        self.target = target
+        self.alpha = alpha
+        # values of every categorical feature, in the order they came
+        self.levels = {column: [] for column in self.categorical}
+        # intercept, the numeric features and their missing indicators
+        self.dense = 1 + 2 * len(self.numeric)
+        self.xtx = np.zeros((self.dense, self.dense))
+        self.xty = np.zeros(self.dense)
+        self.count = 0
+        self._coef = None
+
+    @classmethod
+    def fit(cls, data, **kwargs):
+        return cls(**kwargs).update(data)
+
+    def _dense(self, data):
+        columns = [np.ones(len(data))]
+        for column in self.numeric:
+            values = data[column].to_numpy(dtype='float64', na_value=np.nan)
+            missing = np.isnan(values)
+            columns += [np.where(missing, 0, values), missing.astype('float64')]
+        return np.column_stack(columns)
+
+    def _codes(self, data, column, grow=False):
+        values = data[column].astype(object).where(data[column].notna(), None)
+        known = pd.Index(self.levels[column])
+        codes = known.get_indexer(values)
+        if grow:
+            new = pd.unique(values[(codes < 0) & values.notna().to_numpy()])
+            if len(new):
+                self.levels[column] += [_plain(value) for value in new]
+                codes = pd.Index(self.levels[column]).get_indexer(values)
+        return codes
+
+    def _offsets(self):
+        sizes = [len(self.levels[column]) for column in self.categorical]
+        return self.dense + np.concatenate([[0], np.cumsum(sizes)]).astype('int64')
+
+    def update(self, data):
+        """Add the sales of `data` to the sums of the normal equations."""
+        y = data[self.target].to_numpy(dtype='float64', na_value=np.nan)
+        rows = ~np.isnan(y)
+        data, y = data[rows], y[rows]
+
+        dense = self._dense(data)
+        old_offsets = self._offsets()
+        codes = [self._codes(data, column, grow=True) for column in self.categorical]
+        offsets = self._offsets()
+        if not np.array_equal(old_offsets, offsets):
+            # move the old blocks to their new place before growing
+            mapping = np.concatenate([np.arange(self.dense)] + [
+                np.arange(start, start + size)
+                for start, size in zip(offsets[:-1], np.diff(old_offsets))
+            ]).astype('int64')
+            xtx = np.zeros((offsets[-1], offsets[-1]))
+            xty = np.zeros(offsets[-1])
+            xtx[np.ix_(mapping, mapping)] = self.xtx
+            xty[mapping] = self.xty
+            self.xtx, self.xty = xtx, xty
+
+        d = self.dense
+        self.xtx[:d, :d] += dense.T @ dense
+        self.xty[:d] += dense.T @ y
+        for number, (column, code) in enumerate(zip(self.categorical, codes)):
+            start, end = offsets[number], offsets[number + 1]
+            size = end - start
+            known = code >= 0
+            c = code[known]
+            counts = np.bincount(c, minlength=size)
+            self.xtx[np.arange(start, end), np.arange(start, end)] += counts
+            self.xty[start:end] += np.bincount(c, weights=y[known], minlength=size)
+            cross = np.array([np.bincount(c, weights=dense[known, j], minlength=size)
+                              for j in range(d)])
+            self.xtx[:d, start:end] += cross
+            self.xtx[start:end, :d] += cross.T
+            for other in range(number + 1, len(self.categorical)):
+                other_start, other_end = offsets[other], offsets[other + 1]
+                other_size = other_end - other_start
+                both = known & (codes[other] >= 0)
+                pairs = np.bincount(code[both] * other_size + codes[other][both],
+                                    minlength=size * other_size).reshape(size, other_size)
+                self.xtx[start:end, other_start:other_end] += pairs
+                self.xtx[other_start:other_end, start:end] += pairs.T
+        self.count += len(y)
+        self._coef = None
+        return self
+
+    def _penalty(self):
+        penalty = np.full(len(self.xty), self.alpha)
+        penalty[0] = 0
+        if self.count:
+            sums = self.xtx[0, 1:self.dense]
+            squares = np.diag(self.xtx)[1:self.dense]
+            variance = np.maximum(squares / self.count - (sums / self.count) ** 2, 0)
+            # a constant column, e.g. a feature never missing, keeps the
+            # penalty of the categories so that the system is solvable
+            penalty[1:self.dense] = np.where(variance > 0, self.alpha * variance, self.alpha)
+        return penalty
+
+    @property
+    def coef(self):
+        """Coefficients: intercept, numeric features and indicators, then categories."""
+        if self._coef is None:
+            if not self.count:
+                raise ValueError('the model has no sales')
+            self._coef = np.linalg.solve(self.xtx + np.diag(self._penalty()), self.xty)
+        return self._coef
+
+    def coefficients(self):
+        """The coefficients as a Series indexed by (feature, value)."""
+        names = [('intercept', '')]
+        for column in self.numeric:
+            names += [(column, ''), (column, 'missing')]
+        for column in self.categorical:
+            names += [(column, level) for level in self.levels[column]]
+        return pd.Series(self.coef, index=pd.MultiIndex.from_tuples(names,
+                                                                    names=['feature', 'value']))
+
+    def predict(self, data):
+        """Predicted price per meter of every listing of `data`.
+
+        A category the model has not seen adds nothing to the prediction.
+        """
+        coef = self.coef
+        prediction = self._dense(data) @ coef[:self.dense]
+        for number, column in enumerate(self.categorical):
+            start = self._offsets()[number]
+            code = self._codes(data, column)
+            known = code >= 0
+            prediction[known] += coef[start + code[known]]
+        return pd.Series(prediction, index=data.index, name=self.target)
+
+    def r2(self, data):
+        y = data[self.target].to_numpy(dtype='float64', na_value=np.nan)
+        residuals = y - self.predict(data).to_numpy()
+        known = ~np.isnan(y)
+        return 1 - np.sum(residuals[known] ** 2) / np.sum((y[known] - y[known].mean()) ** 2)
+
+    def save(self, path):
+        state = {
+            'version': MODEL_VERSION,
+            'numeric': self.numeric,
+            'categorical': self.categorical,
+            'target': self.target,
+            'alpha': self.alpha,
+            'levels': self.levels,
+            'count': self.count,
+            'xtx': self.xtx.tolist(),
+            'xty': self.xty.tolist(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state['version'] != MODEL_VERSION:
+            raise ValueError('unsupported model version: {}'.format(state['version']))
+        model = cls(state['numeric'], state['categorical'], state['target'], state['alpha'])
+        model.levels = state['levels']
+        model.count = state['count']
+        model.xtx = np.array(state['xtx'])
+        model.xty = np.array(state['xty'])
+        return model
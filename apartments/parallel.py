@@ -0,0 +1,103 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .cleaning import SUPER_LIST, clean, fill_balcony, filter_outliers
+from .dtypes import downcast
+from .features import add_features
+from .loading import load_data
+from .streaming import _value_counts_median
+
+
+def byte_ranges(path, parts):
+    """Split the file in `parts` ranges of whole lines, after the header."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start = f.tell()
+        bounds = [start]
+        for i in range(1, parts):
+            f.seek(max(start + (size - start) * i // parts, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return header, [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _load_part(path, header, start, end, usecols=None):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        body = f.read(end - start)
+    return load_data(io.BytesIO(header + body), usecols=usecols)
+
+
+def _scan_part(path, header, start, end):
+    # what the whole file has to agree on, for one part
+    data = _load_part(path, header, start, end,
+                      usecols=sorted(set(SUPER_LIST) | {'ceiling_height', 'locality_name'}))
+    # the gaps filled before the cast do not count
+    fill_balcony(data)
+    return {
+        'ceiling': data['ceiling_height'].value_counts(),
+        'missing': {column: bool(data[column].isna().any()) for column in SUPER_LIST},
+        # the categories only, read_csv sorts them
+        'localities': data['locality_name'].array[:0],
+    }
+
+
+def _process_part(path, header, start, end, ceiling_height, cast_columns, localities):
+    data = _load_part(path, header, start, end)
+    # the categories of the whole file, so the names are normalized into
+    # the same categories, in the same order, as in the serial pipeline
+    data['locality_name'] = data['locality_name'].cat.set_categories(localities)
+    # the types are chosen once for the whole file, after the concat
+    return clean(data, ceiling_height=ceiling_height, cast_columns=cast_columns, cast=False)
+
+
+def _combine(scans):
+    ceiling = pd.concat([scan['ceiling'] for scan in scans]).groupby(level=0).sum()
+    missing = {column: any(scan['missing'][column] for scan in scans) for column in SUPER_LIST}
+    if ceiling.sum():
+        missing['ceiling_height'] = False
+    cast_columns = [column for column in SUPER_LIST if not missing[column]]
+    localities = union_categoricals([scan['localities'] for scan in scans],
+                                    sort_categories=True).categories
+    return _value_counts_median(ceiling), cast_columns, localities
+
+
+def run_parallel(path, n_jobs=None, parts=None):
+    """Clean, filter and derive the columns of the file on all cores.
+
+    The file is split in byte ranges of whole lines, so every process
+    parses its own part. A first quick pass over the parts collects what
+    the whole file has to agree on (the median ceiling height, the columns
+    without missing values, the locality categories); then every part is
+    parsed and cleaned with them. The parts are put back together in file
+    order and the steps that need the whole file run once on the result:
+    the types are chosen by dtypes.downcast, the outliers are filtered and
+    the columns derived. So the result, and the outliers report, are the
+    ones of the serial pipeline whatever the number of processes.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    header, ranges = byte_ranges(path, parts or n_jobs)
+    if not ranges:
+        # a file with the header only still gives an empty frame
+        ranges = [(len(header), len(header))]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        scans = list(pool.map(_scan_part, *zip(*[(path, header, a, b) for a, b in ranges])))
+        ceiling_height, cast_columns, localities = _combine(scans)
+        parts = list(pool.map(
+            _process_part,
+            *zip(*[(path, header, a, b, ceiling_height, cast_columns, localities)
+                   for a, b in ranges])
+        ))
+
+    # the parts share the locality categories, so they stay categorical
+    data = pd.concat(parts, ignore_index=True)
+    data, _ = downcast(data)
+    data, report = filter_outliers(data)
+    return add_features(data), report
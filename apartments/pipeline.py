@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .aggregation import compute_breakdowns
+from .cleaning import cast_types, fill_balcony, filling, filter_outliers, normalize_localities
+from .features import add_features
+from .loading import load_data
+
+
+TRACE_VERSION = 1
+
+
+def _load(path, outputs):
+    return load_data(path)
+
+
+def _fill(data, outputs):
+    fill_balcony(data)
+    return filling(data, 'ceiling_height')
+
+
+def _cast(data, outputs):
+    data, outputs['dtypes'] = cast_types(data)
+    return data
+
+
+def _normalize(data, outputs):
+    return normalize_localities(data)
+
+
+def _filter(data, outputs):
+    data, outputs['outliers'] = filter_outliers(data)
+    return data
+
+
+def _derive(data, outputs):
+    return add_features(data)
+
+
+def _aggregate(data, outputs):
+    outputs['breakdowns'] = compute_breakdowns(data)
+    return data
+
+
+# The steps of the research, in order. Every step takes what the previous
+# one returned and a dict where it can leave other results, e.g. the
+# outliers report.
+STAGES = [
+    ('load', _load),
+    ('fill', _fill),
+    ('cast', _cast),
+    ('normalize', _normalize),
+    ('filter', _filter),
+    ('derive', _derive),
+    ('aggregate', _aggregate),
+]
+
+
+def _memory():
+    # current and peak resident set size in bytes; the peak is the one
+    # since the last _reset_peak where the system allows to reset it
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        return (int(status['VmRSS'].split()[0]) * 1024,
+                int(status['VmHWM'].split()[0]) * 1024)
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return None, peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _reset_peak():
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _rows(value):
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+class Pipeline:
+    """The steps of the research as named stages, with a trace of every run.
+
+    For every stage the runner records the wall and CPU time, the rows
+    that came in and out, the resident memory before the stage and the
+    peak during it, and the difference of the two. The trace is a plain
+    dict, written to json with `write_trace` and compared between runs
+    with `compare_traces`.
+    """
+
+    def __init__(self, stages=None):
+        self.stages = list(STAGES if stages is None else stages)
+        self.outputs = {}
+        self.trace = None
+
+    def run(self, source):
+        self.outputs = {}
+        records = []
+        started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        value = source
+        for name, stage in self.stages:
+            rows_in = _rows(value)
+            rss_before, _ = _memory()
+            _reset_peak()
+            wall, cpu = time.perf_counter(), time.process_time()
+            value = stage(value, self.outputs)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            _, peak = _memory()
+            records.append({
+                'stage': name,
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                'rss_before': rss_before,
+                'peak_rss': peak,
+                'peak_rss_delta': (peak - rss_before
+                                   if peak is not None and rss_before is not None else None),
+                'rows_in': rows_in,
+                'rows_out': _rows(value),
+            })
+        self.trace = {
+            'version': TRACE_VERSION,
+            'source': source if isinstance(source, str) else None,
+            'started': started,
+            'stages': records,
+            'wall_seconds': round(sum(record['wall_seconds'] for record in records), 6),
+            'cpu_seconds': round(sum(record['cpu_seconds'] for record in records), 6),
+        }
+        return value
+
+    def report(self):
+        """The trace of the last run as a frame, one row per stage."""
+        if self.trace is None:
+            raise ValueError('the pipeline has not run')
+        return trace_frame(self.trace)
+
+
+def trace_frame(trace):
+    return pd.DataFrame(trace['stages']).set_index('stage')
+
+
+def write_trace(trace, path):
+    partial = path + '.partial'
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, indent=1)
+    os.replace(partial, path)
+
+
+def read_trace(path):
+    with open(path, encoding='utf-8') as f:
+        trace = json.load(f)
+    if trace.get('version') != TRACE_VERSION:
+        raise ValueError('unsupported trace version: {}'.format(trace.get('version')))
+    return trace
+
+
+def compare_traces(old, new, columns=('wall_seconds', 'cpu_seconds', 'peak_rss_delta', 'rows_out')):
+    """The measures of two runs side by side, with the ratio new / old."""
+    old, new = trace_frame(old), trace_frame(new)
+    parts = {}
+    for column in columns:
+        parts[(column, 'old')] = old[column]
+        parts[(column, 'new')] = new[column]
+        if column != 'rows_out':
+            parts[(column, 'ratio')] = new[column].astype('float64') / old[column].astype('float64')
+    return pd.DataFrame(parts)
@@ -0,0 +1,62 @@
+import numpy as np
+from matplotlib.colors import LogNorm
+
+
+# Above this number of points a scatter plot is drawn as a 2d histogram.
+DENSITY_POINTS = 50000
+
+DENSITY_BINS = (200, 150)
+
+
+def binned_counts(x, y, bins=DENSITY_BINS, range=None):
+    """Counts of the points in a grid of bins, and the edges of the bins.
+
+    `range` is ((xmin, xmax), (ymin, ymax)); any part of it that is None
+    is taken from the points. Points with a missing coordinate or outside
+    the range are left out.
+    """
+    known = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[known], y[known]
+    limits = []
+    for values, window in zip((x, y), range or (None, None)):
+        low, high = window if window is not None else (None, None)
+        if low is None:
+            low = values.min() if len(values) else 0
+        if high is None:
+            high = values.max() if len(values) else 1
+        limits.append((low, high if high > low else low + 1))
+    return np.histogram2d(x, y, bins=bins, range=limits)
+
+
+def density_scatter(data, x, y, ax=None, max_points=DENSITY_POINTS, bins=DENSITY_BINS,
+                    xlim=None, ylim=None, figsize=(10, 5), alpha=0.5, grid=True):
+    """Scatter plot of two columns that stays fast for any number of rows.
+
+    Up to `max_points` rows the points are drawn one by one, as with
+    data.plot(kind='scatter'). Above, they are counted in a grid of bins
+    over the view window (`xlim`, `ylim`, else the range of the data)
+    and the counts are drawn as one image with a logarithmic color scale,
+    so the time and the size of the figure do not grow with the rows.
+    Returns the axes.
+    """
+    if ax is None:
+        import matplotlib.pyplot as plt
+        _, ax = plt.subplots(figsize=figsize)
+    xs = data[x].to_numpy(dtype='float64', na_value=np.nan)
+    ys = data[y].to_numpy(dtype='float64', na_value=np.nan)
+
+    if len(data) <= max_points:
+        ax.scatter(xs, ys, alpha=alpha, s=10)
+    else:
+        counts, x_edges, y_edges = binned_counts(xs, ys, bins, (xlim, ylim))
+        counts = np.ma.masked_equal(counts, 0)
+        mesh = ax.pcolormesh(x_edges, y_edges, counts.T, norm=LogNorm(), cmap='viridis')
+        ax.figure.colorbar(mesh, ax=ax, label='listings')
+    if xlim is not None:
+        ax.set_xlim(*xlim)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    ax.grid(grid)
+    return ax
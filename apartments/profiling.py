@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+
+BLOCK_ROWS = 1000000
+
+
+class MissingProfile:
+    """Missing values of a frame: counts, percentages and co-missingness.
+
+    Everything is computed in one pass over blocks of rows. Each block
+    gives the null counts and a product of 0/1 matrices for the
+    co-missingness (rows where two columns are both missing), so memory
+    does not grow with the rows. The null masks are kept packed in bits
+    (one bit per value), so breakdowns by group need no new pass over the
+    frame. The profile is a snapshot: build a new one after filling a
+    column.
+    """
+
+    def __init__(self, data, block_rows=BLOCK_ROWS):
+        self.rows = len(data)
+        self.columns = list(data.columns)
+
+        counts = np.zeros(len(self.columns), dtype='int64')
+        co_missing = np.zeros((len(self.columns), len(self.columns)), dtype='int64')
+        packed = []
+        for start in range(0, self.rows, block_rows):
+            part = data.iloc[start:start + block_rows]
+            mask = np.array([part[column].isna().to_numpy() for column in self.columns])
+            counts += mask.sum(axis=1)
+            # float32 sums are exact up to 2**24 rows per block
+            block = mask.astype('float32')
+            co_missing += (block @ block.T).astype('int64')
+            packed.append(np.packbits(mask, axis=1))
+
+        self.counts = pd.Series(counts, index=self.columns)
+        self.co_missing = pd.DataFrame(co_missing, index=self.columns, columns=self.columns)
+        self._packed = packed
+        self._block_rows = block_rows
+
+    @property
+    def percentages(self):
+        return self.counts / max(self.rows, 1) * 100
+
+    def co_missing_share(self):
+        """Share of the rows missing the row column that also miss the other one."""
+        return self.co_missing.div(self.counts.replace(0, np.nan), axis=0)
+
+    def _mask(self, number):
+        return np.concatenate([
+            np.unpackbits(block[number], count=min(self._block_rows, self.rows - i * self._block_rows))
+            for i, block in enumerate(self._packed)
+        ]).astype(bool) if self._packed else np.zeros(0, dtype=bool)
+
+    def by(self, groups):
+        """Percentage of missing values of every column in every group.
+
+        `groups` is a Series aligned with the profiled frame, such as its
+        locality_name or the year of first_day_exposition.
+        """
+        codes, uniques = pd.factorize(groups, sort=True)
+        known = codes >= 0
+        sizes = np.bincount(codes[known], minlength=len(uniques))
+        table = {
+            column: np.bincount(codes[self._mask(number) & known], minlength=len(uniques))
+            for number, column in enumerate(self.columns)
+        }
+        table = pd.DataFrame(table, index=pd.Index(uniques, name=groups.name))
+        return table.div(np.maximum(sizes, 1), axis=0) * 100
+
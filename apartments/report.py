@@ -0,0 +1,278 @@
+import base64
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .aggregation import REPORT_BREAKDOWNS, compute_breakdowns
+from .features import price_gradient
+from .histograms import HistogramStore
+from .locality import CITY, LocalityIndex
+from .plotting import DENSITY_POINTS, density_scatter
+
+
+# Tables of the research that are not pivot tables, from the data.
+def _km_price(data):
+    return price_gradient(data).set_index('km_to_center')[['km_price']]
+
+
+REPORT_TABLES = {
+    'km_price': _km_price,
+}
+
+# The figures of the research: kind, data, title and options. The data
+# of a 'hist', a 'box' or a 'count' is a column, of a 'scatter' the x and
+# y columns and of a 'bar' or 'line' one of the REPORT_BREAKDOWNS or
+# REPORT_TABLES. A 'hist' can take only the rows `where` the columns have
+# the given values, or the other rows with `exclude`; a 'bar' the
+# `column` to draw, after sorting by `sort_by` and keeping the `head`.
+REPORT_FIGURES = {
+    'total_area': ('hist', 'total_area', 'Total area', {'range': (0, 300), 'bins': 100}),
+    'living_area': ('hist', 'living_area', 'Living area', {'range': (10, 100), 'bins': 100}),
+    'last_price': ('hist', 'last_price', 'Price', {'range': (0, 30000000), 'bins': 100}),
+    'rooms': ('hist', 'rooms', 'Rooms', {'range': (1, 6), 'bins': 10}),
+    'kitchen_area': ('hist', 'kitchen_area', 'Kitchen area', {'range': (3, 30), 'bins': 10}),
+    'ceiling_height': ('hist', 'ceiling_height', 'Ceiling height',
+                       {'range': (2, 10), 'bins': 10}),
+    'floor': ('hist', 'floor', 'Floor', {'range': (0, 50), 'bins': 80}),
+    'floors_total': ('hist', 'floors_total', 'Floors in the building',
+                     {'range': (0, 60), 'bins': 60}),
+    'parks_nearest': ('hist', 'parks_nearest', 'Distance to the nearest park',
+                      {'range': (0, 3000), 'bins': 30}),
+    'day': ('hist', 'day', 'Day of publication', {'range': (0, 7), 'bins': 20}),
+    'month': ('hist', 'month', 'Month of publication', {'range': (1, 12), 'bins': 30}),
+    'days_exposition': ('hist', 'days_exposition', 'Days until the sale',
+                        {'range': (0, 400), 'bins': 10}),
+    'days_exposition_box': ('box', 'days_exposition', 'Days until the sale', {}),
+    'floor_apartment': ('count', 'floor_apartment', 'Type of floor', {}),
+    'spb_km_to_center': ('hist', 'km_to_center', 'Distance to the center in St. Petersburg',
+                         {'range': (0, 50), 'bins': 100, 'where': {'locality_name': CITY}}),
+    'other_km_to_center': ('hist', 'km_to_center',
+                           'Distance to the center of St. Petersburg in the other localities',
+                           {'range': (0, 100), 'bins': 100,
+                            'where': {'locality_name': CITY}, 'exclude': True}),
+    'price_total_area': ('scatter', ('total_area', 'last_price'),
+                         'Correlation between price and total area',
+                         {'ylim': (300000, 30000000)}),
+    'price_living_area': ('scatter', ('living_area', 'last_price'),
+                          'Correlation between price and living area',
+                          {'ylim': (300000, 30000000)}),
+    'price_kitchen_area': ('scatter', ('kitchen_area', 'last_price'),
+                           'Correlation between price and kitchen area',
+                           {'ylim': (300000, 30000000)}),
+    'price_km_to_center': ('scatter', ('km_to_center', 'last_price'),
+                           'Correlation between price and distance to the center',
+                           {'ylim': (300000, 30000000)}),
+    'pivot_rooms': ('bar', 'pivot_rooms',
+                    'Relationship between the median price and the number of rooms', {}),
+    'pivot_floor_apartment': ('bar', 'pivot_floor_apartment',
+                              'Relationship between the median price and type of floor', {}),
+    'day_price': ('bar', 'day_price',
+                  'Relationship between the median price and day of publication', {}),
+    'month_price': ('bar', 'month_price',
+                    'Relationship between median price and month of publication', {}),
+    'year_price': ('bar', 'year_price',
+                   'Relationship between median price and year of publication', {}),
+    'localities_price': ('bar', 'localities_price',
+                         'Average price per meter in the 10 localities with the most ads',
+                         {'column': ('mean', 'price_per_meter'),
+                          'sort_by': ('count', 'price_per_meter'), 'head': 10}),
+    'center_price': ('line', 'center_price',
+                     'Average cost of apartments in St. Petersburg and distance to the center', {}),
+    'km_price': ('bar', 'km_price',
+                 'Change in the average cost of an apartment for each kilometer', {}),
+}
+
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'index.html'
+
+
+def _draw(ax, kind, frame, options):
+    if kind == 'hist':
+        # the counts of the bins, computed with the HistogramStore
+        edges = np.append(frame['start'].to_numpy(), frame['end'].iloc[-1])
+        ax.hist(frame['start'], bins=edges, weights=frame.iloc[:, 2])
+        ax.set_xlabel(frame.columns[2])
+        ax.grid(True)
+    elif kind == 'box':
+        # like data.boxplot(column=...)
+        column = frame.columns[0]
+        ax.boxplot(frame[column].dropna(), tick_labels=[column])
+        ax.grid(True)
+    elif kind == 'count':
+        ax.bar([str(label) for label in frame.index], frame['count'])
+        ax.set_xlabel(frame.index.name)
+        ax.grid(True)
+    elif kind == 'scatter':
+        x, y = frame.columns
+        density_scatter(frame, x, y, ax=ax, max_points=options.get('max_points', DENSITY_POINTS),
+                        ylim=options.get('ylim'))
+    elif kind == 'bar':
+        ax.bar([str(label) for label in frame.index], frame.iloc[:, 0])
+        ax.set_xlabel(frame.index.name)
+        ax.set_ylabel(str(frame.columns[0]))
+        if len(frame) > 20:
+            ax.tick_params(axis='x', labelrotation=80)
+    elif kind == 'line':
+        ax.plot(frame.index, frame.iloc[:, 0])
+        ax.set_xlabel(frame.index.name)
+        ax.set_ylabel(frame.columns[0])
+    else:
+        raise ValueError('unknown figure kind: {}'.format(kind))
+    if 'ylim' in options:
+        ax.set_ylim(*options['ylim'])
+
+
+def render_figure(kind, frame, title, options, path):
+    """Draw one figure off screen, with the Agg canvas, to a PNG file."""
+    figure = Figure(figsize=options.get('figsize', (12, 5)))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    _draw(ax, kind, frame, options)
+    ax.set_title(title)
+    figure.tight_layout()
+    figure.savefig(path, dpi=options.get('dpi', 100))
+    return path
+
+
+def _rows(data, options, localities=None):
+    # the rows a figure is drawn from, see REPORT_FIGURES; the localities
+    # are selected through `localities`, a LocalityIndex of the data
+    where = options.get('where')
+    if not where:
+        return data
+    mask = np.ones(len(data), dtype=bool)
+    for column, value in where.items():
+        if column == 'locality_name':
+            if localities is None:
+                localities = LocalityIndex(data[column])
+            mask &= localities.mask(value)
+        else:
+            mask &= (data[column] == value).fillna(False).to_numpy(dtype=bool)
+    return data[~mask if options.get('exclude') else mask]
+
+
+def _rows_key(options):
+    return repr((sorted((options.get('where') or {}).items()), bool(options.get('exclude'))))
+
+
+def figure_data(data, kind, source, breakdowns, stores, options=None):
+    """What a figure draws, small enough to be sent to another process.
+
+    `stores` holds a HistogramStore for the rows of every 'hist', by
+    their _rows_key.
+    """
+    options = options or {}
+    if kind in ('bar', 'line'):
+        table = breakdowns[source]
+        if 'sort_by' in options:
+            table = table.sort_values(by=options['sort_by'], ascending=False)
+        if 'head' in options:
+            table = table.head(options['head'])
+        if 'column' in options:
+            table = table[[options['column']]]
+        return table
+    if kind == 'hist':
+        store = stores[_rows_key(options)]
+        counts, edges = store.histogram(source, options.get('bins', 10), options.get('range'))
+        return pd.DataFrame({'start': edges[:-1], 'end': edges[1:], source: counts})
+    if kind == 'count':
+        return data[source].value_counts(sort=False).to_frame('count')
+    return data[[source] if isinstance(source, str) else list(source)]
+
+
+def data_hash(frame, spec):
+    """Hash of what a figure shows: its data and its settings."""
+    digest = hashlib.sha256(repr(spec).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(repr(list(frame.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(output_dir, figures):
+    parts = ['<!DOCTYPE html>', '<html><head><meta charset="utf-8">',
+             '<title>Sales of apartments</title></head><body>']
+    for name, (_, _, title, _) in figures.items():
+        with open(os.path.join(output_dir, name + '.png'), 'rb') as f:
+            image = base64.b64encode(f.read()).decode('ascii')
+        parts.append('<h2 id="{0}">{1}</h2>'.format(html.escape(name), html.escape(title)))
+        parts.append('<img src="data:image/png;base64,{}" alt="{}">'.format(
+            image, html.escape(name)))
+    parts.append('</body></html>')
+    with open(os.path.join(output_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(parts))
+
+
+def render_report(data, output_dir, figures=None, n_jobs=None):
+    """Render the figures of the research to a directory, without a display.
+
+    Every figure is drawn to a PNG on its own Figure with the Agg canvas,
+    in a pool of processes, and all of them go to one self-contained
+    index.html. The hash of the data and settings of every figure is kept
+    in manifest.json, and a figure whose hash did not change since the
+    last run is not drawn again. Returns a frame with the status of every
+    figure.
+    """
+    if figures is None:
+        figures = REPORT_FIGURES
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = _read_manifest(manifest_path)
+
+    tables = {source for kind, source, _, _ in figures.values() if kind in ('bar', 'line')}
+    pivots = {name: REPORT_BREAKDOWNS[name] for name in tables if name in REPORT_BREAKDOWNS}
+    breakdowns = compute_breakdowns(data, pivots) if pivots else {}
+    breakdowns.update({name: REPORT_TABLES[name](data) for name in tables if name in REPORT_TABLES})
+    # one HistogramStore for every set of rows, with all its columns
+    columns = {}
+    for kind, source, _, options in figures.values():
+        if kind == 'hist':
+            columns.setdefault(_rows_key(options), (options, set()))[1].add(source)
+    localities = None
+    if any('locality_name' in (options.get('where') or {}) for options, _ in columns.values()):
+        localities = LocalityIndex(data['locality_name'])
+    stores = {key: HistogramStore(_rows(data, options, localities), sorted(names))
+              for key, (options, names) in columns.items()}
+
+    hashes, pending = {}, []
+    for name, spec in figures.items():
+        kind, source, title, options = spec
+        frame = figure_data(data, kind, source, breakdowns, stores, options)
+        hashes[name] = data_hash(frame, spec)
+        path = os.path.join(output_dir, name + '.png')
+        if manifest.get(name) != hashes[name] or not os.path.exists(path):
+            pending.append((kind, frame, title, options, path))
+
+    if pending:
+        n_jobs = n_jobs or os.cpu_count() or 1
+        if n_jobs == 1 or len(pending) == 1:
+            for task in pending:
+                render_figure(*task)
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(pending))) as pool:
+                list(pool.map(render_figure, *zip(*pending)))
+
+    manifest.update(hashes)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    _write_index(output_dir, figures)
+
+    rendered = {os.path.basename(task[-1])[:-len('.png')] for task in pending}
+    return pd.DataFrame({
+        'status': ['rendered' if name in rendered else 'unchanged' for name in figures],
+        'hash': [hashes[name][:12] for name in figures],
+    }, index=pd.Index(list(figures), name='figure'))
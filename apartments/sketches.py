@@ -0,0 +1,332 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class _Store:
+    # Counts of logarithmic buckets, kept in a dense array starting at
+    # bucket `offset`.
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype='int64')
+
+    def _extend(self, low, high):
+        if not len(self.counts):
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype='int64')
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        if new_low == self.offset and new_high == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1, dtype='int64')
+        start = self.offset - new_low
+        counts[start:start + len(self.counts)] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    def add(self, keys):
+        if not len(keys):
+            return
+        low, high = int(keys.min()), int(keys.max())
+        self._extend(low, high)
+        self.counts += np.bincount(keys - self.offset, minlength=len(self.counts))
+
+    def merge(self, other):
+        if not len(other.counts):
+            return
+        self._extend(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + len(other.counts)] += other.counts
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a bounded relative error.
+
+    Values are counted in logarithmic buckets, so any quantile is returned
+    within `relative_accuracy` of the true value and the memory depends on
+    the range of the values, not on their number. Sketches built over
+    different chunks are combined with `merge`. Up to `exact_limit`
+    values are also kept as they are, and while there are no more the
+    quantiles and the MAD are exact.
+    """
+
+    def __init__(self, relative_accuracy=0.005, exact_limit=0):
+        self.relative_accuracy = relative_accuracy
+        self.exact_limit = exact_limit
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.count = 0
+        self.zero_count = 0
+        self.sum = 0.0
+        # sum of squared deviations from the mean, for the variance
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._positive = _Store()
+        self._negative = _Store()
+        # the values themselves, None once there are more than exact_limit
+        self._exact = np.zeros(0) if exact_limit else None
+
+    def _keep(self, values):
+        if self._exact is not None:
+            if self.count <= self.exact_limit:
+                self._exact = np.concatenate([self._exact, values])
+            else:
+                self._exact = None
+
+    def _keys(self, values):
+        return np.ceil(np.log(values) / self._log_gamma).astype('int64')
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        self._add_moments(len(values), float(values.sum()), float(((values - values.mean()) ** 2).sum()))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        positive = values > 0
+        negative = values < 0
+        self.zero_count += int(len(values) - positive.sum() - negative.sum())
+        self._positive.add(self._keys(values[positive]))
+        self._negative.add(self._keys(-values[negative]))
+        self._keep(values)
+        return self
+
+    def _add_moments(self, count, total, m2):
+        # pairwise update of Chan et al., stable for large values
+        if self.count:
+            delta = total / count - self.sum / self.count
+            m2 += self.m2 + delta ** 2 * self.count * count / (self.count + count)
+        self.count += count
+        self.sum += total
+        self.m2 = m2
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('cannot merge sketches with a different relative accuracy')
+        if not other.count:
+            return self
+        self._add_moments(other.count, other.sum, other.m2)
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._positive.merge(other._positive)
+        self._negative.merge(other._negative)
+        if other._exact is None:
+            self._exact = None
+        self._keep(other._exact)
+        return self
+
+    def _value(self, key):
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def _ranked(self, ranks):
+        # the value of rank `ranks` (from 0) in the sorted values; the
+        # smallest and the largest are known exactly
+        values, counts = self._buckets()
+        index = np.searchsorted(np.cumsum(counts), ranks, side='right')
+        # the bucket representative never lies outside the observed values
+        ranked = np.clip(values[np.minimum(index, len(values) - 1)], self.min, self.max)
+        ranked = np.where(ranks <= 0, self.min, ranked)
+        return np.where(ranks >= self.count - 1, self.max, ranked)
+
+    def quantile(self, q):
+        """Value at quantile `q`, a number or an array of them.
+
+        Like Series.quantile, the value lies between the two values whose
+        ranks surround q * (count - 1), linearly interpolated.
+        """
+        q = np.asarray(q, dtype='float64')
+        if not self.count:
+            return np.full(q.shape, np.nan)[()]
+        if self._exact is not None:
+            return np.quantile(self._exact, q)[()]
+        rank = q * (self.count - 1)
+        lower, upper = np.floor(rank), np.ceil(rank)
+        low, high = self._ranked(lower), self._ranked(upper)
+        return (low + (high - low) * (rank - lower))[()]
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def mean(self):
+        return self.sum / self.count if self.count else math.nan
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75)):
+        """The statistics of Series.describe, from the sketch."""
+        percentiles = list(percentiles)
+        names = ['{:g}%'.format(p * 100) for p in percentiles]
+        return pd.Series(
+            [self.count, self.mean(), self.std(), self.min if self.count else math.nan]
+            + list(np.atleast_1d(self.quantile(percentiles)))
+            + [self.max if self.count else math.nan],
+            index=['count', 'mean', 'std', 'min'] + names + ['max'],
+        )
+
+    def _buckets(self):
+        # representative value and count of every non empty bucket
+        negative = np.flatnonzero(self._negative.counts)[::-1]
+        positive = np.flatnonzero(self._positive.counts)
+        values = np.concatenate([
+            -self._value(self._negative.offset + negative),
+            [0.0] if self.zero_count else [],
+            self._value(self._positive.offset + positive),
+        ])
+        counts = np.concatenate([
+            self._negative.counts[negative],
+            [self.zero_count] if self.zero_count else [],
+            self._positive.counts[positive],
+        ])
+        return values, counts
+
+    def mad(self):
+        """Median absolute deviation from the median.
+
+        From the buckets the deviations of the values close to the median
+        are known only to about relative_accuracy times the median, so
+        the MAD is exact only while the values are kept (exact_limit).
+        """
+        if not self.count:
+            return math.nan
+        if self._exact is not None:
+            return float(np.median(np.abs(self._exact - np.median(self._exact))))
+        values, counts = self._buckets()
+        deviations = np.abs(values - self.median())
+        order = np.argsort(deviations, kind='stable')
+        deviations, cumulative = deviations[order], np.cumsum(counts[order])
+        # the median of the deviations, interpolated as in quantile
+        rank = 0.5 * (self.count - 1)
+        lower, upper = np.searchsorted(cumulative, [math.floor(rank), math.ceil(rank)],
+                                       side='right')
+        return float((deviations[lower] + deviations[upper]) / 2)
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'zero_count': self.zero_count,
+            'sum': self.sum,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max,
+            'positive': [self._positive.offset, self._positive.counts.tolist()],
+            'negative': [self._negative.offset, self._negative.counts.tolist()],
+            'exact_limit': self.exact_limit,
+            'exact': None if self._exact is None else self._exact.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state['relative_accuracy'], state.get('exact_limit', 0))
+        sketch.count = state['count']
+        sketch.zero_count = state['zero_count']
+        sketch.sum = state['sum']
+        sketch.m2 = state.get('m2', 0.0)
+        sketch.min = state['min']
+        sketch.max = state['max']
+        for store, (offset, counts) in ((sketch._positive, state['positive']),
+                                        (sketch._negative, state['negative'])):
+            store.offset = offset
+            store.counts = np.array(counts, dtype='int64')
+        exact = state.get('exact')
+        sketch._exact = None if exact is None else np.array(exact, dtype='float64')
+        return sketch
+
+
+class SketchTable:
+    """Quantile sketches of several columns, for every group of `by`.
+
+    A table can be built from a chunk of the data or in a worker and
+    merged with the others; its median, quantile and describe look like
+    the ones of DataFrame, or of DataFrame.groupby(by) when `by` is given.
+    """
+
+    def __init__(self, columns, by=None, relative_accuracy=0.005):
+        self.columns = list(columns)
+        self.by = by
+        self.relative_accuracy = relative_accuracy
+        # {group: {column: sketch}}, the only group is None without `by`
+        self.sketches = {}
+
+    def _group(self, key):
+        group = self.sketches.get(key)
+        if group is None:
+            group = self.sketches[key] = {
+                column: QuantileSketch(self.relative_accuracy) for column in self.columns
+            }
+        return group
+
+    def update(self, data):
+        values = {column: data[column].to_numpy(dtype='float64', na_value=np.nan)
+                  for column in self.columns}
+        if self.by is None:
+            for column, sketch in self._group(None).items():
+                sketch.update(values[column])
+            return self
+
+        codes, keys = pd.factorize(data[self.by])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(keys)))
+        order = order[np.count_nonzero(codes < 0):]
+        for key, rows in zip(keys, np.split(order, bounds[:-1])):
+            key = key.item() if isinstance(key, np.generic) else key
+            for column, sketch in self._group(key).items():
+                sketch.update(values[column][rows])
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns or other.by != self.by:
+            raise ValueError('cannot merge sketch tables of different columns')
+        for key, sketches in other.sketches.items():
+            group = self._group(key)
+            for column, sketch in sketches.items():
+                group[column].merge(sketch)
+        return self
+
+    def _keys(self):
+        return sorted(self.sketches) if self.by is not None else [None]
+
+    def _table(self, statistic):
+        keys = self._keys()
+        table = pd.DataFrame(
+            [[statistic(self._group(key)[column]) for column in self.columns] for key in keys],
+            columns=self.columns,
+        )
+        if self.by is None:
+            return table.iloc[0]
+        table.index = pd.Index(keys, name=self.by)
+        return table
+
+    def quantile(self, q):
+        return self._table(lambda sketch: sketch.quantile(q))
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def mean(self):
+        return self._table(QuantileSketch.mean)
+
+    def count(self):
+        return self._table(lambda sketch: sketch.count)
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75)):
+        keys = self._keys()
+        if self.by is None:
+            return pd.DataFrame({
+                column: self._group(None)[column].describe(percentiles) for column in self.columns
+            })
+        return pd.concat({
+            column: pd.DataFrame(
+                [self._group(key)[column].describe(percentiles) for key in keys],
+                index=pd.Index(keys, name=self.by),
+            )
+            for column in self.columns
+        }, axis=1)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from .aggregation import group_medians
+
+
+# Bands of every distance, in meters. The last band of every distance,
+# after the ones listed, is for the listings where it is unknown.
+DISTANCE_BANDS = {
+    'cityCenters_nearest': [0, 3000, 7000, 12000, 20000, 35000, np.inf],
+    'airports_nearest': [0, 10000, 20000, 30000, 45000, np.inf],
+    'parks_nearest': [0, 500, 1000, 3000, np.inf],
+    'ponds_nearest': [0, 500, 1000, 3000, np.inf],
+}
+
+STATISTICS = ['count', 'median', 'mean', 'min', 'max']
+
+
+def _band_labels(bands):
+    labels = ['[{:g}, {:g})'.format(low, high) for low, high in zip(bands[:-1], bands[1:])]
+    return labels + ['unknown']
+
+
+class DistanceGrid:
+    """Listings bucketed in cells of distance bands, with their prices.
+
+    Every listing falls in one cell of center x airport x park x pond
+    bands (DISTANCE_BANDS). The cells are numbered, so the cell of a
+    listing is a few comparisons and its statistics an array lookup. The
+    price statistics of `value` in every cell and the positions of the
+    listings of every cell are computed once, when the grid is built.
+    """
+
+    def __init__(self, data, bands=None, value='price_per_meter'):
+        self.bands = {column: np.asarray(edges, dtype='float64')
+                      for column, edges in (DISTANCE_BANDS if bands is None else bands).items()}
+        self.value = value
+        self.shape = tuple(len(edges) for edges in self.bands.values())
+        size = int(np.prod(self.shape))
+
+        cells = self.cells(data)
+        values = data[value].to_numpy(dtype='float64', na_value=np.nan)
+        known = ~np.isnan(values)
+        medians, counts = group_medians(cells, values, size)
+        sums = np.bincount(cells[known], weights=values[known], minlength=size)
+        lowest = np.full(size, np.inf)
+        highest = np.full(size, -np.inf)
+        np.minimum.at(lowest, cells[known], values[known])
+        np.maximum.at(highest, cells[known], values[known])
+        empty = counts == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.statistics = {
+                'count': counts,
+                'median': medians,
+                'mean': sums / counts,
+                'min': np.where(empty, np.nan, lowest),
+                'max': np.where(empty, np.nan, highest),
+            }
+
+        # positions of the listings of every cell, as slices of one order
+        sizes = np.bincount(cells, minlength=size)
+        self.bounds = np.concatenate([[0], np.cumsum(sizes)])
+        self.order = np.argsort(cells, kind='stable')
+        self.index = data.index
+
+    def cells(self, data):
+        """Cell number of every listing of `data`."""
+        parts = []
+        for column, edges in self.bands.items():
+            distances = data[column].to_numpy(dtype='float64', na_value=np.nan)
+            band = np.searchsorted(edges, distances, side='right') - 1
+            # below the first edge goes to the first band, unknown to the last
+            band = np.clip(band, 0, len(edges) - 2)
+            band[np.isnan(distances)] = len(edges) - 1
+            parts.append(band)
+        return np.ravel_multi_index(parts, self.shape).astype('int64')
+
+    def lookup(self, data, statistics=None):
+        """Price statistics of the cell of every listing of `data`."""
+        cells = self.cells(data)
+        return pd.DataFrame({
+            statistic: self.statistics[statistic][cells]
+            for statistic in (STATISTICS if statistics is None else statistics)
+        }, index=data.index)
+
+    def positions(self, cell):
+        return self.order[self.bounds[cell]:self.bounds[cell + 1]]
+
+    def comparables(self, data, listing):
+        """The listings of `data`, the frame of the grid, in the cell of `listing`.
+
+        `listing` is a row of any frame with the distance columns, e.g.
+        data.loc[label] or a new ad.
+        """
+        cell = self.cells(pd.DataFrame([listing]))[0]
+        return data.take(self.positions(cell))
+
+    def table(self):
+        """Statistics of the non empty cells, indexed by their bands."""
+        index = pd.MultiIndex.from_product(
+            [_band_labels(edges) for edges in self.bands.values()], names=list(self.bands))
+        table = pd.DataFrame(self.statistics, index=index)
+        return table[table['count'] > 0]
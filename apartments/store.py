@@ -0,0 +1,193 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+STORE_VERSION = 1
+
+_META_FILE = 'meta.json'
+
+
+def _codes_dtype(size):
+    # the type pandas uses for the codes of so many categories, so that
+    # the codes read from the disk are used without a copy
+    for dtype in ('int8', 'int16', 'int32'):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype('int64')
+
+
+def _encode(series):
+    # (kind, arrays to write, extra metadata) of a column
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or not (
+            pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)
+            or pd.api.types.is_datetime64_any_dtype(dtype)):
+        # text is dictionary encoded, every name is kept once in the header
+        categorical = series.astype('category').array
+        categories = categorical.categories
+        codes = categorical.codes.astype(_codes_dtype(len(categories)))
+        return 'category', {'values': codes}, {'categories': categories.tolist(),
+                                               'categories_dtype': str(categories.dtype),
+                                               'ordered': bool(categorical.ordered)}
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        # nullable numbers: the missing values are written as 0 and the mask
+        # tells them apart
+        values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.numpy_dtype.type(0))
+        return ('masked', {'values': values, 'mask': series.isna().to_numpy()},
+                {'dtype': str(dtype)})
+    return 'plain', {'values': series.to_numpy()}, {}
+
+
+def write_store(data, path, **info):
+    """Write the frame as a directory of memory mapped column files.
+
+    Every column is a .npy file, with a second one for the mask of the
+    nullable columns; text columns such as locality_name are dictionary
+    encoded, the codes go to the file and the names to the header. The
+    header meta.json has the number of rows, the columns and `info`, any
+    json data about where the frame comes from. The directory is written
+    under a temporary name and renamed when complete.
+    """
+    partial = path.rstrip(os.sep) + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+
+    columns = []
+    for number, column in enumerate(data.columns):
+        kind, arrays, extra = _encode(data[column])
+        files = {}
+        for part, values in arrays.items():
+            name = '{}.{}.npy'.format(number, part)
+            np.save(os.path.join(partial, name), np.ascontiguousarray(values), allow_pickle=False)
+            files[part] = name
+        columns.append(dict(name=column, kind=kind, files=files, **extra))
+
+    meta = {'version': STORE_VERSION, 'rows': len(data), 'columns': columns, 'info': info}
+    with open(os.path.join(partial, _META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(partial, path)
+    return open_store(path)
+
+
+class ColumnStore:
+    """Read only view of a store written by write_store.
+
+    Nothing is read when the store is opened but the header. The columns
+    are memory mapped, so a query only pages in the columns it asks for,
+    and of those only the rows it selects; the frames are built on top of
+    the mapped arrays without copying them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, _META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['version'] != STORE_VERSION:
+            raise ValueError('{} is a store of version {}, not {}'.format(
+                path, meta['version'], STORE_VERSION))
+        self.rows = meta['rows']
+        self.info = meta['info']
+        self._meta = {column['name']: column for column in meta['columns']}
+        self._arrays = {}
+        self._dtypes = {}
+
+    @property
+    def columns(self):
+        return list(self._meta)
+
+    def __len__(self):
+        return self.rows
+
+    def _array(self, column, part='values'):
+        key = (column, part)
+        if key not in self._arrays:
+            meta = self._meta.get(column)
+            if meta is None:
+                raise KeyError(column)
+            mapped = np.load(os.path.join(self.path, meta['files'][part]), mmap_mode='r')
+            # a plain array on the same memory, results of numpy
+            # operations are then plain arrays and not memmaps
+            self._arrays[key] = mapped.view(np.ndarray)
+        return self._arrays[key]
+
+    def dtype(self, column):
+        if column not in self._dtypes:
+            meta = self._meta[column]
+            if meta['kind'] == 'category':
+                categories = pd.Index(meta['categories'], dtype=meta.get('categories_dtype'))
+                dtype = pd.CategoricalDtype(categories, ordered=meta['ordered'])
+            elif meta['kind'] == 'masked':
+                dtype = pd.api.types.pandas_dtype(meta['dtype'])
+            else:
+                dtype = self._array(column).dtype
+            self._dtypes[column] = dtype
+        return self._dtypes[column]
+
+    def codes(self, column):
+        """The mapped codes of a dictionary encoded column."""
+        if self._meta[column]['kind'] != 'category':
+            raise ValueError('{} is not dictionary encoded'.format(column))
+        return self._array(column)
+
+    def array(self, column, rows=None):
+        """The column as a pandas array, for all the rows or a selection.
+
+        `rows` is a slice, which keeps the array a view of the file, or the
+        positions or boolean mask of the rows, which are copied.
+        """
+        meta = self._meta[column]
+        select = slice(None) if rows is None else rows
+        values = self._array(column)[select]
+        if meta['kind'] == 'category':
+            return pd.Categorical.from_codes(values, dtype=self.dtype(column), validate=False)
+        if meta['kind'] == 'masked':
+            mask = self._array(column, 'mask')[select]
+            return self.dtype(column).construct_array_type()(values, mask)
+        return values
+
+    def where(self, **conditions):
+        """Positions of the rows where every column takes one of the values.
+
+        A condition is a value or a list of them. Dictionary encoded
+        columns are compared through their codes, so the names are looked
+        up once and only the codes are read.
+        """
+        selected = np.ones(self.rows, dtype=bool)
+        for column, wanted in conditions.items():
+            wanted = list(wanted) if isinstance(wanted, (list, tuple, set)) else [wanted]
+            if self._meta[column]['kind'] == 'category':
+                categories = self.dtype(column).categories
+                codes = categories.get_indexer(wanted)
+                selected &= np.isin(self.codes(column), codes[codes >= 0])
+            else:
+                selected &= np.isin(np.asarray(self.array(column)), wanted)
+        return np.flatnonzero(selected)
+
+    def frame(self, columns=None, rows=None, **conditions):
+        """A frame of some columns and rows of the store.
+
+        Without `rows` and conditions the frame is built on the mapped
+        arrays, which are read only: new columns can be added, but the
+        values are changed on a copy(). Conditions are given as in `where`, e.g.
+        frame(['km_to_center', 'last_price'], locality_name='Санкт-Петербург').
+        The index is the position of the rows in the store.
+        """
+        columns = self.columns if columns is None else list(columns)
+        if conditions:
+            selected = self.where(**conditions)
+            rows = selected if rows is None else np.intersect1d(
+                np.arange(self.rows)[rows], selected)
+        index = pd.RangeIndex(self.rows)[slice(None) if rows is None else rows]
+        return pd.DataFrame({column: self.array(column, rows) for column in columns},
+                            index=index, copy=False)
+
+
+def open_store(path):
+    return ColumnStore(path)
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+from .cleaning import SUPER_LIST, clean, fill_balcony, filter_outliers
+from .features import add_features
+from .loading import load_data
+from .locality import CITY
+from .sketches import SketchTable
+
+
+CHUNKSIZE = 500000
+
+# Columns summarized with count, mean and median in the research section.
+SUMMARY_COLUMNS = [
+    'last_price', 'total_area', 'living_area', 'kitchen_area', 'rooms',
+    'ceiling_height', 'floor', 'floors_total', 'km_to_center', 'km_to_airports',
+    'parks_nearest', 'day', 'month', 'days_exposition', 'price_per_meter',
+]
+
+# Median last_price pivot tables and the column each one is indexed by.
+PIVOTS = {
+    'pivot_rooms': 'rooms',
+    'pivot_floor_apartment': 'floor_apartment',
+    'day_price': 'day',
+    'month_price': 'month',
+    'year_price': 'year',
+}
+
+
+def _values(series):
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _add_sums(totals, series, by):
+    # running count and sum of `series` per value of `by`
+    grouped = series.groupby(by, observed=True).agg(['count', 'sum'])
+    for key, count, total in zip(grouped.index, grouped['count'], grouped['sum']):
+        current = totals.setdefault(key, [0, 0.0])
+        current[0] += int(count)
+        current[1] += float(total)
+
+
+def _merge_sums(totals, other):
+    for key, (count, total) in other.items():
+        current = totals.setdefault(key, [0, 0.0])
+        current[0] += count
+        current[1] += total
+
+
+class StreamingReport:
+    """Statistics of the research accumulated chunk by chunk.
+
+    Only counts, sums and quantile sketches are kept, so the memory does not
+    grow with the number of ads. Reports built over different parts of the
+    file can be combined with `merge`.
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.relative_accuracy = relative_accuracy
+        self.rows_in = 0
+        self.rows_out = 0
+        self.columns = SketchTable(SUMMARY_COLUMNS, relative_accuracy=relative_accuracy)
+        self.pivots = {
+            name: SketchTable(['last_price'], by=column, relative_accuracy=relative_accuracy)
+            for name, column in PIVOTS.items()
+        }
+        self.localities = {}
+        self.center = {}
+
+    def update(self, data, rows_in=None):
+        """Add a cleaned chunk with the new columns already in place."""
+        self.rows_in += len(data) if rows_in is None else rows_in
+        self.rows_out += len(data)
+
+        self.columns.update(data)
+        for table in self.pivots.values():
+            table.update(data)
+
+        price = pd.Series(_values(data['last_price']), index=data.index)
+        _add_sums(self.localities, data['price_per_meter'], data['locality_name'])
+        city = (data['locality_name'] == CITY).fillna(False).to_numpy(dtype=bool)
+        _add_sums(self.center, price[city], data['km_to_center'][city])
+        return self
+
+    def merge(self, other):
+        self.rows_in += other.rows_in
+        self.rows_out += other.rows_out
+        self.columns.merge(other.columns)
+        for name, table in self.pivots.items():
+            table.merge(other.pivots[name])
+        _merge_sums(self.localities, other.localities)
+        _merge_sums(self.center, other.center)
+        return self
+
+    def summary(self):
+        """describe() of the summary columns, one row per column."""
+        return self.columns.describe().T
+
+    def pivot(self, name):
+        """Median last_price by the column of the pivot, like pivot_table."""
+        return self.pivots[name].median()
+
+    def localities_price(self):
+        names = list(self.localities)
+        counts = np.array([self.localities[name][0] for name in names])
+        sums = np.array([self.localities[name][1] for name in names])
+        table = pd.DataFrame(
+            {('count', 'price_per_meter'): counts, ('mean', 'price_per_meter'): sums / counts},
+            index=pd.Index(names, name='locality_name'),
+        )
+        return table.round().sort_values(by=('count', 'price_per_meter'), ascending=False)
+
+    def center_price(self):
+        keys = sorted(self.center)
+        return pd.DataFrame(
+            {'last_price': [self.center[key][1] / self.center[key][0] for key in keys]},
+            index=pd.Index(keys, name='km_to_center'),
+        ).round()
+
+
+def _value_counts_median(counts):
+    # exact median from the counts of every distinct value
+    counts = counts.sort_index()
+    total = counts.sum()
+    if not total:
+        return np.nan
+    cumulative = counts.cumsum().to_numpy()
+    values = counts.index.to_numpy(dtype='float64')
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+    return (lower + upper) / 2
+
+
+def scan_globals(path, chunksize=CHUNKSIZE):
+    """First pass over the file for what cannot be known from one chunk.
+
+    Returns the median ceiling height used to fill the gaps, the row
+    numbers of the cheapest and the most expensive ad, which the research
+    drops before anything else, and the SUPER_LIST columns without gaps
+    in the whole file, the only ones cast_types may round in every chunk.
+    """
+    ceiling = pd.Series(dtype='int64')
+    missing = dict.fromkeys(SUPER_LIST, False)
+    lowest = highest = None
+    usecols = sorted(set(SUPER_LIST) | {'last_price', 'ceiling_height'})
+    for chunk in load_data(path, usecols=usecols, chunksize=chunksize):
+        ceiling = ceiling.add(chunk['ceiling_height'].value_counts(), fill_value=0)
+        # the gaps filled before the cast do not count
+        fill_balcony(chunk)
+        for column in SUPER_LIST:
+            missing[column] = missing[column] or bool(chunk[column].isna().any())
+        price = chunk['last_price']
+        if price.notna().any():
+            if lowest is None or price.min() < lowest[1]:
+                lowest = (price.idxmin(), price.min())
+            if highest is None or price.max() > highest[1]:
+                highest = (price.idxmax(), price.max())
+    if ceiling.sum():
+        missing['ceiling_height'] = False
+    cast_columns = [column for column in SUPER_LIST if not missing[column]]
+    extremes = [extreme[0] for extreme in (lowest, highest) if extreme is not None]
+    return _value_counts_median(ceiling), extremes, cast_columns
+
+
+def stream_report(path, chunksize=CHUNKSIZE, relative_accuracy=0.005):
+    """Run the whole research over a file that does not fit in memory.
+
+    The file is read twice, `chunksize` rows at a time: once for the
+    global values of scan_globals and once to clean, filter and summarize
+    every chunk into a StreamingReport.
+    """
+    ceiling_height, extremes, cast_columns = scan_globals(path, chunksize)
+    report = StreamingReport(relative_accuracy)
+    for chunk in load_data(path, chunksize=chunksize):
+        # the chunks keep the row numbers of the whole file
+        rows_in = len(chunk)
+        chunk = chunk.drop(chunk.index.intersection(extremes))
+        chunk = clean(chunk, ceiling_height=ceiling_height, cast_columns=cast_columns)
+        # the cheapest and the dearest ad are already dropped above
+        chunk, _ = filter_outliers(chunk, extremes=[])
+        if chunk.empty:
+            # nothing to summarize, e.g. a file with the header only
+            report.rows_in += rows_in
+            continue
+        chunk = add_features(chunk)
+        report.update(chunk, rows_in=rows_in)
+    return report
@@ -0,0 +1,68 @@
+# Speedup of the parallel pipeline with the number of processes.
+#
+# A synthetic listings file is built by sampling the rows of
+# real_estate_data.csv, then apartments.parallel.run_parallel is timed
+# with 1, 2, 4, ... processes up to the number of cores.
+#
+#     python benchmarks/bench_parallel.py --rows 10000000
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from apartments.parallel import run_parallel  # noqa: E402
+
+
+SOURCE = os.path.join(os.path.dirname(__file__), os.pardir, 'real_estate_data.csv')
+
+
+def make_file(path, rows, source=SOURCE, block=1000000, seed=0):
+    with open(source, 'rb') as f:
+        header = f.readline()
+        lines = np.array(f.read().splitlines(keepends=True), dtype=object)
+    rng = np.random.default_rng(seed)
+    with open(path, 'wb') as f:
+        f.write(header)
+        for start in range(0, rows, block):
+            sample = rng.integers(0, len(lines), min(block, rows - start))
+            f.write(b''.join(lines[sample]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--jobs', type=int, nargs='+',
+                        help='numbers of processes to time (1, 2, 4, ... up to the cores)')
+    parser.add_argument('--path', help='reuse or keep the synthetic file here')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    jobs = args.jobs or sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'listings.csv')
+    if not os.path.exists(path):
+        print('writing {} rows to {}'.format(args.rows, path))
+        make_file(path, args.rows)
+
+    print('{:>5} {:>10} {:>8} {:>11}'.format('jobs', 'seconds', 'speedup', 'efficiency'))
+    baseline = None
+    for n_jobs in jobs:
+        start = time.perf_counter()
+        data, _ = run_parallel(path, n_jobs=n_jobs)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed * n_jobs / jobs[0]
+        speedup = baseline / elapsed
+        print('{:>5} {:>10.2f} {:>8.2f} {:>10.0%}'.format(n_jobs, elapsed, speedup, speedup / n_jobs))
+        del data
+
+    if not args.path:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
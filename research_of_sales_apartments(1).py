@@ -20,24 +20,28 @@ import seaborn as sns
 # In[2]:
 
 
-data = pd.read_csv(r'C:\Users\pinos\Desktop\statistics\real_estate_data.csv', 
-                   
-                   sep = '\t')
+# The file is read with an explicit schema (apartments.SCHEMA): small nullable integers for the counters, float32 for the distances, a category for locality_name and first_day_exposition already parsed as a date. The path can be set with the REAL_ESTATE_DATA environment variable.
 
+import os
 
-# In[5]:
+from apartments import load_data
+
+data = load_data(os.environ.get('REAL_ESTATE_DATA', 'real_estate_data.csv'))
+
+
+# In[3]:
 
 
 data.info()
 
 
-# In[3]:
+# In[4]:
 
 
 data.head()
 
 
-# In[4]:
+# In[5]:
 
 
 data.hist(figsize=(15, 20))
@@ -52,19 +56,26 @@ data.hist(figsize=(15, 20))
 # In[6]:
 
 
-data.isna().sum()
+from apartments.profiling import MissingProfile
 
+profile = MissingProfile(data)
+profile.counts
 
-# We write a function to see the missing values in percentages.
+
+# We look at the missing values in percentages.
 
 # In[7]:
 
 
-def percentages_missing():
-    
-    return data.isna().sum() / len(data) * 100
+profile.percentages
 
-percentages_missing()
+
+# The distances to parks and ponds tend to be missing together: the share of the ads without a park distance that don't have a pond distance either.
+
+# In[8]:
+
+
+profile.co_missing_share().loc[['parks_nearest', 'ponds_nearest'], ['parks_nearest', 'ponds_nearest']]
 
 
 # We see that there are columns with a lot of missing data, this may be due to various reasons, for example, the advertiser does not know the height of the ceiling. In other cases, such as the distance from the park, it may happen that the advertiser deliberately hides it to facilitate the sale, in case the apartment is very far away. The fact is, so far, we don't know. We're going to go piece by piece, solving each variable separately.
@@ -73,99 +84,48 @@ percentages_missing()
 
 # A good solution for the balcony is to assume that if it is not on the list, there is a high probability that the apartment doesn't have a balcony. We will fill it with the value 0.
 
-# In[8]:
+# In[9]:
 
 
-data['balcony'].fillna(0, inplace=True)
+from apartments.cleaning import cast_types, fill_balcony, filling
+
+fill_balcony(data)
 
 
 # We check the first of our changes.
 
-# In[9]:
+# In[10]:
 
 
-data.isna().sum()
+MissingProfile(data).counts
 
 
 # For the variables living_area, and kitchen_area it would be ok keep them as it is because changing them can drive us to some analytical problems. The variable ceiling_height, we change it for the mean.
 
-# In[10]:
-
+# In[11]:
 
-def filling(column):
-    
-    x = data[column].median()
-    data[column] = data[column].fillna(x)
 
-filling('ceiling_height')
+filling(data, 'ceiling_height')
 
 
 # # Working with Data Types
 
 # We change the variables kitchen_area, balcony, total_area, last_price, ceiling_height, floors_total, living_area, parks_around3000, ponds_around3000, ponds_nearest, parks_nearest and so on from float to int, since decimals for these columns do not make much sense. We will proceed from the assumption that there is no park or pond nearby.
 
-# In[11]:
-
-
-super_list = [
-      
-    'parks_around3000',
-    'parks_nearest',
-    'ponds_around3000',
-    'ponds_nearest',
-    'last_price',
-    'ceiling_height',               
-    'floors_total',              
-    'living_area',
-    'total_area',
-    'kitchen_area',
-    'balcony',
-    'airports_nearest',
-    'cityCenters_nearest',
-    'days_exposition'  
-    
-]
-
-for i in super_list:
-    
-    try:
-        
-        data[i] = data[i].round().astype('int')
-    
-    except Exception as err:
-        
-        continue
-        
-
-
-# Now we only have to take care of two variables: is_apartment, locality_name. locality_name let's logically switch to str and add quotes, is_apartment we fill in 0 and change its type to bool.
-
 # In[12]:
 
 
-data['is_apartment'] = data['is_apartment'].fillna(0).astype('bool')
+# The list of these columns is apartments.cleaning.SUPER_LIST.
 
+data, dtypes_report = cast_types(data)
+dtypes_report
 
-# In[13]:
 
+# cast_types also takes care of is_apartment, we fill in False and change its type to bool. The columns with missing values are not rounded, but like all the others they are stored in the smallest type that keeps their values, the report above shows how much memory that saves.
 
-data['locality_name'] = data['locality_name'].astype('str')
+# locality_name is loaded as a category, so the names that are missing stay missing instead of becoming the string 'nan'. The first_day_exposition variable is parsed as a date while reading the file.
 
-
-# In the first_day_exposition variable, we will correct the date.
-
-# In[14]:
-
-
-data['first_day_exposition'] = pd.to_datetime(
-    
-    data['first_day_exposition'], 
-    
-    format = '%Y-%m-%d'
-)
-
-
-# In[15]:
+# In[13]:
 
 
 # checking all the changes
@@ -173,7 +133,7 @@ data['first_day_exposition'] = pd.to_datetime(
 data.info()
 
 
-# In[16]:
+# In[14]:
 
 
 # looking for unique values in the locality_name column
@@ -181,7 +141,7 @@ data.info()
 data['locality_name'].unique()
 
 
-# In[17]:
+# In[15]:
 
 
 # counts values
@@ -191,32 +151,29 @@ data['locality_name'].value_counts()
 
 # As we can see in value_counts, there are values that we need to change for better analysis. Now let's move on to correcting all the inaccuracies found.
 
-# In[18]:
+# In[16]:
 
 
-locality_names = (['поселок', 'посёлок', 'городского типа', 'городской', 'коттеджный', 'станции', 
-                   'при железнодорожной', 'садовое товарищество', 'садоводческое некоммерческое товарищество', 
-                   'деревня', 'село'])
+# The settlement type words (поселок, деревня, село and so on) are listed in apartments.LOCALITY_NAMES. They are removed from the unique names only and mapped back to every ad.
 
-for i in range(len(data['locality_name'])):
-    if pd.isna(data.loc[i, 'locality_name']) != True:
-        for x in locality_names:
-            if x in data.loc[i, 'locality_name']:
-                data.loc[i, 'locality_name'] = data.loc[i, 'locality_name'].replace(x, '', 1)
-                data.loc[i, 'locality_name'] = data.loc[i, 'locality_name'].lstrip()
+from apartments import normalize_locality_names
 
+data['locality_name'] = normalize_locality_names(data['locality_name'])
 
-# In[19]:
+
+# In[17]:
 
 
 data['locality_name'].value_counts()
 
 
 # We checked and replaced implicit duplicates in the names of localities.
+# 
+# All the steps above are collected in apartments.cleaning.clean. apartments.cache.load_clean runs them once and keeps the cleaned dataset in a Parquet file in .cache, keyed by the content of the csv file and the cleaning configuration, so the next runs can start from here.
 
 # We will deal with all the anomalies. To do this, we will use the description method applied to last_price, one of the most important variables in the dataset.
 
-# In[20]:
+# In[18]:
 
 
 data['last_price'].describe()
@@ -224,7 +181,7 @@ data['last_price'].describe()
 data['last_price'].count()
 
 
-# In[21]:
+# In[19]:
 
 
 print('{:f}'.format(1.219000e+04))
@@ -236,31 +193,30 @@ print('{:f}'.format(6.800000e+06))
 
 # Since we can estimate the minimum and maximum, it is very suspicious that housing costs 12,000 rubles or 763 million rubles. So we are going to remove these values from the dataset.
 
-# In[22]:
+# The cheapest and the most expensive ads are collected in apartments.cleaning.EXTREME_COLUMNS. All the anomalies are removed at once at the end of this section, here we only look at the prices without these two.
 
+# In[20]:
 
-data = data.drop(data['last_price'].idxmin()).reset_index(drop=True)
 
-data = data.drop(data['last_price'].idxmax()).reset_index(drop=True)
+data['last_price'].sort_values().iloc[1:-1].describe()
 
 
-# In[23]:
+# After removing the minimum and maximum, we see that we still have a suspiciously high maximum. Thus, we plan to visualize those houses whose cost exceeds 100 million rubles.
 
+# In[21]:
 
-data['last_price'].describe()
 
+# Every histogram is drawn from counts of the values computed once, see apartments.histograms. The store is built again whenever the data changes.
 
-# After removing the minimum and maximum, we see that we still have a suspiciously high maximum. Thus, we plan to visualize those houses whose cost exceeds 100 million rubles.
+from apartments.histograms import HistogramStore
 
-# In[24]:
-
-
-data.hist('last_price', bins=100, range=(0, data['last_price'].median()*10))
+store = HistogramStore(data)
+store.plot('last_price', bins=100, range=(0, data['last_price'].median()*10))
 
 
 # As the graph shows, housing worth more than 20 million rubles does not seem to be enough. However, we will zoom in to see how many of them exceed 30 million.
 
-# In[25]:
+# In[22]:
 
 
 (data.query('last_price > 30000000')['last_price']
@@ -276,39 +232,17 @@ data.hist('last_price', bins=100, range=(0, data['last_price'].median()*10))
 
 # As we can see, there are very few houses worth more than 30 million rubles, so we are going to exclude them from the analysis without fear that this will affect the result.
 
-# In[26]:
-
-
-data = data.drop(
-    
-    data.query('last_price > 30000000')
-    
-    .index).reset_index(drop=True)
-
-
-# In[27]:
-
-
-data['last_price'].describe()
-
-
-# In[28]:
-
-
-100 - ((data['last_price'].count() / 23699) * 100) 
-
-
-# We just deleted 1.3% of the data in this column.
+# This limit goes to apartments.cleaning.OUTLIER_RULES, all the anomalies are removed at once at the end of this section.
 
 # We turn to the study of the total square meters of housing.
 
-# In[29]:
+# In[23]:
 
 
 data['total_area'].describe()
 
 
-# In[30]:
+# In[24]:
 
 
 data['rooms'].describe()
@@ -316,15 +250,15 @@ data['rooms'].describe()
 
 # There are two values that catch the eye: one is the minimum value of 12 meters, and the other is the maximum value of 460. At least in Moscow, houses with a length of only 12 meters are for sale, and in Spain houses of 460 meters are usually sold. It can be rented, but we risk that such housing in St. Petersburg really exists. So we'll leave it as it is.
 
-# In[31]:
+# In[25]:
 
 
-data.hist('rooms', bins=100, range=(0, data['rooms'].median()*10))
+store.plot('rooms', bins=100, range=(0, data['rooms'].median()*10))
 
 
 # We see how few houses have an area of more than 5 meters. We follow the same steps as above to make sure before deleting non-standard values.
 
-# In[33]:
+# In[26]:
 
 
 (data.query('rooms > 5')['rooms']
@@ -346,39 +280,11 @@ data.hist('rooms', bins=100, range=(0, data['rooms'].median()*10))
                 color = 'Black'))
 
 
-# In[34]:
-
-
-data = data.drop(data.query('rooms > 10').index).reset_index(drop=True)
-
-
 # It can be seen that there is almost no houses with that parameter, so we are going to exclude those houses with more than 7 rooms.
 
-# In[35]:
-
-
-data = data.drop(
-    
-    data.query('rooms > 7')
-    
-    .index).reset_index(drop=True)
-
-
-# In[36]:
-
-
-data['rooms'].describe()
-
+# The limit of 7 rooms goes to OUTLIER_RULES as well.
 
-# In[37]:
-
-
-100 - ((data['rooms'].count() / 23363) * 100) 
-
-
-# We haven't eliminated hardly anything in percentage in this column.
-
-# In[38]:
+# In[27]:
 
 
 data['ceiling_height'].describe()
@@ -386,10 +292,10 @@ data['ceiling_height'].describe()
 
 # As for ceilings, it is absolutely unlikely to find houses one meter high or 100 meters high. Let's take a closer look at these parameters.
 
-# In[39]:
+# In[28]:
 
 
-data.hist(
+store.plot(
     
     'ceiling_height', 
     
@@ -398,7 +304,7 @@ data.hist(
     range=(0, data['ceiling_height'].median()*10))
 
 
-# In[51]:
+# In[29]:
 
 
 (data.query('ceiling_height > 5')['ceiling_height']
@@ -420,7 +326,7 @@ data.hist(
                 color = 'Black'))
 
 
-# In[43]:
+# In[30]:
 
 
 (data.query('ceiling_height < 2')['ceiling_height']
@@ -444,29 +350,9 @@ data.hist(
 
 # We proceed to the removal of both those whose height exceeds 5 meters, and those that are less than 2 meters.
 
-# In[44]:
-
-
-data = data.drop(data.query('ceiling_height > 5').index).reset_index(drop=True)
-
-data = data.drop(data.query('ceiling_height < 2').index).reset_index(drop=True)
-
-
-# In[45]:
-
-
-data['ceiling_height'].describe()
-
-
-# In[46]:
+# Both limits are added to OUTLIER_RULES.
 
-
-100 - ((data['ceiling_height'].count() / 23363) * 100) 
-
-
-# 0.14% of the data in this column has been deleted.
-
-# In[47]:
+# In[31]:
 
 
 data['floors_total'].describe()
@@ -474,7 +360,7 @@ data['floors_total'].describe()
 
 # The maximum height of 60 floors does not attract much attention, given that there is a 60-storey building in St. Petersburg.
 
-# In[48]:
+# In[32]:
 
 
 data['living_area'].describe()
@@ -482,10 +368,10 @@ data['living_area'].describe()
 
 # We see a minimum of 0 meters, since it is impossible for the living area to be 0 meters. We will conduct a more detailed analysis in the same spirit as the previous ones.
 
-# In[49]:
+# In[33]:
 
 
-data.hist(
+store.plot(
     
     'living_area', 
     
@@ -496,7 +382,7 @@ data.hist(
 
 # Houses with a living area of more than 100 meters are few, and less than 10 meters are also few.
 
-# In[50]:
+# In[34]:
 
 
 (data.query('living_area < 10')['living_area']
@@ -518,7 +404,7 @@ data.hist(
                 color = 'Black'))
 
 
-# In[52]:
+# In[35]:
 
 
 (data.query('living_area > 150')['living_area']
@@ -542,29 +428,9 @@ data.hist(
 
 # We are starting to remove both, those whose length exceeds 150 meters and those that are less than 10 meters.
 
-# In[53]:
-
-
-data = data.drop(data.query('living_area < 10').index).reset_index(drop=True)
-
-data = data.drop(data.query('living_area > 150').index).reset_index(drop=True)
-
-
-# In[54]:
-
-
-data['living_area'].describe()
-
-
-# In[55]:
-
+# Both limits go to OUTLIER_RULES too.
 
-100 - ((data['living_area'].count() / 21466) * 100) 
-
-
-# 0.3% of the data in this column has been deleted.
-
-# In[56]:
+# In[36]:
 
 
 data['kitchen_area'].describe()
@@ -572,10 +438,10 @@ data['kitchen_area'].describe()
 
 # We continue to take the same steps as before.
 
-# In[57]:
+# In[37]:
 
 
-data.hist(
+store.plot(
     
     'kitchen_area', 
     
@@ -586,7 +452,7 @@ data.hist(
 
 # You can see that there are almost no houses with kitchens more than 20 meters or less than 5. We are moving on to scaling.
 
-# In[59]:
+# In[38]:
 
 
 (data.query('kitchen_area > 30')['kitchen_area']
@@ -608,7 +474,7 @@ data.hist(
                 color = 'Black'))
 
 
-# In[60]:
+# In[39]:
 
 
 (data.query('kitchen_area < 5')['kitchen_area']
@@ -632,43 +498,35 @@ data.hist(
 
 # There are very few houses with a kitchen more than 30 meters and less than 5. We decided to drop these two values.
 
-# In[61]:
-
+# We add them to OUTLIER_RULES, it is the last rule.
 
-data = data.drop(data.query('kitchen_area < 5').index).reset_index(drop=True)
+# In[40]:
 
-data = data.drop(data.query('kitchen_area > 30').index).reset_index(drop=True)
 
-
-# In[62]:
-
-
-data['kitchen_area'].describe()
+data['parks_nearest'].describe()
 
 
-# In[63]:
+# We leave this variable as it is, because we are not detecting any deviations.
 
+# In[41]:
 
-100 - ((data['kitchen_area'].count() / 21042) * 100) 
 
+data.duplicated().sum()
 
-# We have deleted 1.6% of the data in this column.
 
-# In[ ]:
+# No duplicates, great! we can move on.
 
+# Now we remove all the anomalies found above in one pass. The report shows how many ads each rule removed, an ad is counted for the first rule that matches it.
 
-data['parks_nearest'].describe()
+# In[42]:
 
 
-# We leave this variable as it is, because we are not detecting any deviations.
+from apartments.cleaning import filter_outliers
 
-# In[65]:
+data, outliers_report = filter_outliers(data)
 
+outliers_report
 
-data.duplicated().sum()
-
-
-# No duplicates, great! we can move on.
 
 # As a result of data processing, we eliminated those factors that could negatively affect the results of the study, and all this with a data loss of less than 5 percent.
 
@@ -676,13 +534,13 @@ data.duplicated().sum()
 
 # We add the price per square meter to the table.
 
-# In[66]:
+# In[43]:
 
 
 data['price_per_meter'] = data['last_price'] / data['total_area']
 
 
-# In[67]:
+# In[44]:
 
 
 data['price_per_meter'].head()
@@ -690,13 +548,13 @@ data['price_per_meter'].head()
 
 # We perform the function of determining the days of the week on which the ad is published.
 
-# In[68]:
+# In[45]:
 
 
 data['day'] = data['first_day_exposition'].dt.weekday
 
 
-# In[69]:
+# In[46]:
 
 
 data['day'].unique()
@@ -704,13 +562,13 @@ data['day'].unique()
 
 # We do the same with months.
 
-# In[70]:
+# In[47]:
 
 
 data['month'] = data['first_day_exposition'].dt.month
 
 
-# In[71]:
+# In[48]:
 
 
 data['month'].unique()
@@ -718,19 +576,19 @@ data['month'].unique()
 
 # The same for years.
 
-# In[72]:
+# In[49]:
 
 
 data['year'] = data['first_day_exposition'].dt.year
 
 
-# In[73]:
+# In[50]:
 
 
 data['year'].unique()
 
 
-# In[74]:
+# In[51]:
 
 
 data[['day', 'month', 'year']].head()
@@ -740,24 +598,14 @@ data[['day', 'month', 'year']].head()
 
 # We classify floors into first, last, and others.
 
-# In[75]:
+# In[52]:
 
 
-def floor_apartment(floor):
-    
-    if floor['floor'] == 1:
-        
-        return 'first_floor'
-    
-    elif floor['floor'] == floor['floors_total']:
-        
-        return 'last_floor'
-    
-    else:
-        
-        return 'other'
-    
-data['floor_apartment'] = data.apply(floor_apartment, axis = 1)
+# The categories are checked all at once over the floor and floors_total columns, the rules are listed in apartments.features.FLOOR_RULES. If floors_total is missing, the floor goes to the other category.
+
+from apartments.features import floor_categories
+
+data['floor_apartment'] = floor_categories(data)
 
 data['floor_apartment'].unique()
     
@@ -765,7 +613,7 @@ data['floor_apartment'].unique()
 
 # We change the distance metric to the city center and the airport in km for better reading.
 
-# In[76]:
+# In[53]:
 
 
 data['km_to_center'] = (data['cityCenters_nearest'] / 1000).round()
@@ -773,7 +621,7 @@ data['km_to_center'] = (data['cityCenters_nearest'] / 1000).round()
 data['km_to_airports'] = (data['airports_nearest'] / 1000).round()
 
 
-# In[77]:
+# In[54]:
 
 
 data[['km_to_center', 'km_to_airports']]
@@ -783,7 +631,7 @@ data[['km_to_center', 'km_to_airports']]
 
 # We will study the following variables using the mean and median, and then proceed to visualization.
 
-# In[78]:
+# In[55]:
 
 
 data['total_area'].median()
@@ -791,7 +639,7 @@ data['total_area'].median()
 
 # 50 percent of the data in this column has a value below 51, and the remaining 50 percent is above that value.
 
-# In[79]:
+# In[56]:
 
 
 data['total_area'].mean()
@@ -799,10 +647,13 @@ data['total_area'].mean()
 
 # The average value is 6 meters higher than the median value.
 
-# In[80]:
+# In[57]:
+
 
+# the data is filtered and has the new columns now
+store = HistogramStore(data)
 
-data.hist(
+store.plot(
     
     'total_area',
     
@@ -817,7 +668,7 @@ data.hist(
 
 # The graph shows that the areas of most houses are located at a distance of 30 to 50 meters, while the modal value is about 45 meters.
 
-# In[81]:
+# In[58]:
 
 
 data['living_area'].median()
@@ -825,7 +676,7 @@ data['living_area'].median()
 
 # The median living area is 30 meters.
 
-# In[82]:
+# In[59]:
 
 
 data['living_area'].mean()
@@ -833,10 +684,10 @@ data['living_area'].mean()
 
 # The average value is two meters higher than the other one, which means that these two values are almost the same.
 
-# In[83]:
+# In[60]:
 
 
-data.hist(
+store.plot(
     
     'living_area',
     
@@ -851,7 +702,7 @@ data.hist(
 
 # As for the living area, the most common is 18 meters.
 
-# In[84]:
+# In[61]:
 
 
 data['last_price'].mean()
@@ -859,10 +710,10 @@ data['last_price'].mean()
 
 # The average price assumes a million rubles more than the previous one, although the difference is large, the result does not arouse suspicion, because there are housing with very different prices, higher prices affect. In this case, it is not necessarily a bad signal, it is within the expected range.
 
-# In[85]:
+# In[62]:
 
 
-data.hist(
+store.plot(
     
     'last_price',
     
@@ -877,7 +728,7 @@ data.hist(
 
 # The most popular prices are from 4 to 5 million. This more or less corresponds to the statistical values given above.
 
-# In[86]:
+# In[63]:
 
 
 data['rooms'].median()
@@ -885,7 +736,7 @@ data['rooms'].median()
 
 # The median number of rooms is two.
 
-# In[87]:
+# In[64]:
 
 
 data['rooms'].mean()
@@ -893,10 +744,10 @@ data['rooms'].mean()
 
 # We see that the average value is the same.
 
-# In[88]:
+# In[65]:
 
 
-data.hist(
+store.plot(
     
     'rooms',
     
@@ -911,7 +762,7 @@ data.hist(
 
 # The most popular houses are one and two bedroom houses.
 
-# In[89]:
+# In[66]:
 
 
 data['kitchen_area'].median()
@@ -919,10 +770,10 @@ data['kitchen_area'].median()
 
 # The median size of the kitchen is 9 meters.
 
-# In[90]:
+# In[67]:
 
 
-data.hist(
+store.plot(
     
     'kitchen_area',
     
@@ -937,22 +788,22 @@ data.hist(
 
 # The sizes of kitchens, which are most often found, range from 6 to 10 meters. Kitchens less than 5 meters and kitchens more than 10 meters are the ones that have the least presence in the dataset.
 
-# In[91]:
+# In[68]:
 
 
 data['ceiling_height'].median()
 
 
-# In[92]:
+# In[69]:
 
 
 data['ceiling_height'].mean()
 
 
-# In[93]:
+# In[70]:
 
 
-data.hist(
+store.plot(
     
     'ceiling_height',
     
@@ -967,7 +818,7 @@ data.hist(
 
 # The ceiling height ranges from about 2.8 to 3.5 meters. Within the parameters indicated by the mean and median value.
 
-# In[94]:
+# In[71]:
 
 
 data['floor'].median()
@@ -975,7 +826,7 @@ data['floor'].median()
 
 # The median is the fourth floor.
 
-# In[95]:
+# In[72]:
 
 
 data['floor'].mean()
@@ -983,10 +834,10 @@ data['floor'].mean()
 
 # The mean is the sixth floor.
 
-# In[96]:
+# In[73]:
 
 
-data.hist(
+store.plot(
     
     'floor',
     
@@ -999,7 +850,7 @@ data.hist(
 )
 
 
-# In[97]:
+# In[74]:
 
 
 import matplotlib.pyplot as plt
@@ -1011,7 +862,7 @@ plt.show()
 
 # The largest number of houses is in the other category, that is, any floor except the first and last.
 
-# In[98]:
+# In[75]:
 
 
 data['floors_total'].median()
@@ -1019,7 +870,7 @@ data['floors_total'].median()
 
 # The median shows us that half of the buildings have a height of less than 9 floors, and the other half is more than 9 floors.
 
-# In[99]:
+# In[76]:
 
 
 data['floors_total'].mean()
@@ -1027,10 +878,10 @@ data['floors_total'].mean()
 
 # The average value indicates a height of almost 11 floors.
 
-# In[100]:
+# In[77]:
 
 
-data.hist(
+store.plot(
     
     'floors_total',
     
@@ -1045,26 +896,32 @@ data.hist(
 
 # The graph shows two peaks, one on the fifth floor and one on the 9th floor.
 
-# In[101]:
+# In[78]:
+
 
+from apartments.locality import LocalityIndex
 
-data.query('locality_name == "Санкт-Петербург"')['km_to_center'].median()
+localities = LocalityIndex(data['locality_name'])
+spb = localities.select(data, 'Санкт-Петербург')
+other_localities = localities.exclude(data, 'Санкт-Петербург')
+
+spb['km_to_center'].median()
 
 
 # Residential buildings located in St. Petersburg are located at a median distance of 12 km from the center.
 
-# In[102]:
+# In[79]:
 
 
-data.query('locality_name == "Санкт-Петербург"')['km_to_center'].mean()
+spb['km_to_center'].mean()
 
 
 # The average value, we can say, almost coincides with the median.
 
-# In[103]:
+# In[80]:
 
 
-(data.query('locality_name == "Санкт-Петербург"')['km_to_center'].hist(
+(spb['km_to_center'].hist(
     
     range=(0, 50),
     
@@ -1077,26 +934,26 @@ data.query('locality_name == "Санкт-Петербург"')['km_to_center'].m
 
 # It seems that most of the houses are located within 12-15 km from the city center.
 
-# In[104]:
+# In[81]:
 
 
-data.query('locality_name != "Санкт-Петербург"')['km_to_center'].median()
+other_localities['km_to_center'].median()
 
 
 # In other localities , the median reaches 30 km .
 
-# In[105]:
+# In[82]:
 
 
-data.query('locality_name != "Санкт-Петербург"')['km_to_center'].mean()
+other_localities['km_to_center'].mean()
 
 
 # The mean coincides with the median.
 
-# In[106]:
+# In[83]:
 
 
-(data.query('locality_name != "Санкт-Петербург"')['km_to_center'].hist(
+(other_localities['km_to_center'].hist(
     
     range=(0, 100),
     
@@ -1109,13 +966,13 @@ data.query('locality_name != "Санкт-Петербург"')['km_to_center'].m
 
 # In other settlements, housing is located 20-35 km from the city center.
 
-# In[107]:
+# In[84]:
 
 
 data['km_to_airports'].median()
 
 
-# In[108]:
+# In[85]:
 
 
 data['km_to_airports'].mean()
@@ -1138,13 +995,13 @@ data['km_to_airports'].mean()
 
 # The graph shows that the housing is located 17, 19 and 22 km from the airport, and slightly less at 38 km.
 
-# In[111]:
+# In[86]:
 
 
 data['parks_nearest'].median()
 
 
-# In[112]:
+# In[87]:
 
 
 data['parks_nearest'].mean()
@@ -1152,10 +1009,10 @@ data['parks_nearest'].mean()
 
 # The houses have parks at a median distance of 457 meters and an average of 494 meters.
 
-# In[113]:
+# In[88]:
 
 
-data.hist(
+store.plot(
     
     'parks_nearest',
     
@@ -1170,13 +1027,13 @@ data.hist(
 
 # Most of the houses nearby have a park, the distance to which is about 500 meters.
 
-# In[114]:
+# In[89]:
 
 
 data['day'].median()
 
 
-# In[115]:
+# In[90]:
 
 
 data['day'].mean()
@@ -1184,10 +1041,10 @@ data['day'].mean()
 
 # The mean and median are almost the same, and their number corresponds to Thursday.
 
-# In[116]:
+# In[91]:
 
 
-data.hist(
+store.plot(
     
     'day',
     
@@ -1202,13 +1059,13 @@ data.hist(
 
 # More ads are placed on weekdays than on weekends.
 
-# In[117]:
+# In[92]:
 
 
 data['month'].median()
 
 
-# In[118]:
+# In[93]:
 
 
 data['month'].mean()
@@ -1216,10 +1073,10 @@ data['month'].mean()
 
 # The mean and median are the same and correspond to the month of June.
 
-# In[119]:
+# In[94]:
 
 
-data.hist(
+store.plot(
     
     'month',
     
@@ -1236,10 +1093,10 @@ data.hist(
 
 # # Analysis of the Speed of Home Sales in Days
 
-# In[120]:
+# In[95]:
 
 
-data.hist(
+store.plot(
     
     'days_exposition',
     
@@ -1252,13 +1109,13 @@ data.hist(
 )
 
 
-# In[121]:
+# In[96]:
 
 
 data['days_exposition'].describe()
 
 
-# In[122]:
+# In[97]:
 
 
 data.boxplot(column='days_exposition')
@@ -1268,7 +1125,7 @@ data.boxplot(column='days_exposition')
 # 
 # We can say that an apartment that sells quickly is one that sells in 45 days or less, the remaining 75% take more than 45 days. An apartment that takes time to sell is an apartment that takes more than 232 days, which corresponds to the third quartile.
 
-# In[123]:
+# In[98]:
 
 
 data.groupby(by='days_exposition')['last_price'].count().sort_values(ascending=False)
@@ -1280,28 +1137,36 @@ data.groupby(by='days_exposition')['last_price'].count().sort_values(ascending=F
 
 # Next, we will move on to analyzing the dependencies between last_price and total_area.
 
-# In[124]:
+# In[99]:
+
 
+# All the correlations are computed at once, every pair on the rows where both values are known, see apartments.correlation.
 
-data['last_price'].corr(data['total_area'])
+from apartments.correlation import correlation_matrix
+
+correlations = correlation_matrix(data)
+
+correlations.loc['last_price', 'total_area']
 
 
 # The correlation between these two variables is high and positive.
 
-# In[125]:
+# In[100]:
+
 
+# Up to apartments.plotting.DENSITY_POINTS ads every ad is a point, as with data.plot(kind='scatter'); with more of them the points are counted in bins and drawn as a 2d histogram.
 
-data.plot(
+from apartments.plotting import density_scatter
+
+density_scatter(
+    
+    data,
     
     x='total_area',
     
     y='last_price',
     
-    kind='scatter',
-    
-    alpha=0.5,
-    
-    grid=True,
+    ylim=(300000, 30000000),
     
     figsize=(10,5)
 
@@ -1315,29 +1180,28 @@ plt.show()
 
 # The more meters in the house, the more expensive it is.
 
-# In[126]:
+# In[101]:
 
 
-data['last_price'].corr(data['living_area'])
+correlations.loc['last_price', 'living_area']
 
 
-# In[128]:
+# In[102]:
 
 
-data.plot(
+density_scatter(
+    
+    data,
     
     x='living_area',
     
     y='last_price',
     
-    kind='scatter',
-    
-    alpha=0.5,
-    
-    grid=True,
+    ylim=(300000, 30000000),
     
     figsize=(10,5)
-    
+
+
 ).set_title('Correlation between price and living area')
 
 plt.ylim(300000, 30000000)
@@ -1347,26 +1211,24 @@ plt.show()
 
 # There is a strong positive correlation between price and living space. Apartments with a larger living area are the most valuable.
 
-# In[129]:
+# In[103]:
 
 
-data['last_price'].corr(data['kitchen_area'])
+correlations.loc['last_price', 'kitchen_area']
 
 
-# In[130]:
+# In[104]:
 
 
-data.plot(
+density_scatter(
+    
+    data,
     
     x='kitchen_area',
     
     y='last_price',
     
-    kind='scatter',
-    
-    alpha=0.5,
-    
-    grid=True,
+    ylim=(300000, 30000000),
     
     figsize=(10,5)
 
@@ -1380,31 +1242,35 @@ plt.show()
 
 # There is a notable positive correlation between the price and the kitchen area. Apartments with a larger kitchen area are more expensive.
 
-# In[131]:
+# In[105]:
 
 
-data['last_price'].corr(data['rooms'])
+correlations.loc['last_price', 'rooms']
 
 
 # The correlation coefficient shows that there is a notable relationship between these two variables.
 
+# All the pivot tables of the following sections are computed together, they are listed in apartments.aggregation.REPORT_BREAKDOWNS. Every column is grouped and sorted only once for all of them.
+
+# In[106]:
+
+
+from apartments.aggregation import compute_breakdowns
+
+breakdowns = compute_breakdowns(data)
+
+
 # We create a pivot table to study the relationship between rooms and price, and then proceed to its visualization.
 
-# In[132]:
+# In[107]:
 
 
-pivot_rooms = data.pivot_table(
-    
-    index=['rooms'],
-    
-    values=['last_price'],
-    
-    aggfunc='median')
+pivot_rooms = breakdowns['pivot_rooms']
 
 pivot_rooms.head()
 
 
-# In[133]:
+# In[108]:
 
 
 import seaborn as sns
@@ -1432,21 +1298,15 @@ plt.show()
 
 # We do the same with the floor_apartment variable.
 
-# In[134]:
+# In[109]:
 
 
-pivot_floor_apartment = data.pivot_table(
-    
-    index=['floor_apartment'],
-    
-    values=['last_price'],
-    
-    aggfunc='median')
+pivot_floor_apartment = breakdowns['pivot_floor_apartment']
 
 pivot_floor_apartment.head()
 
 
-# In[136]:
+# In[110]:
 
 
 sns.barplot(data = pivot_floor_apartment,
@@ -1472,16 +1332,10 @@ plt.show()
 
 # Now we are going to make a pivot table and visualize it directly to see the relationship between the price and the day of the week.
 
-# In[138]:
+# In[111]:
 
 
-day_price = data.pivot_table(
-    
-    index=['day'],
-    
-    values=['last_price'],
-    
-    aggfunc='median')
+day_price = breakdowns['day_price']
 
 sns.barplot(data = day_price,
             
@@ -1504,16 +1358,10 @@ plt.show()
 
 # The most expensive offers are published on Tuesdays and Wednesdays, but since Thursday there has been a downward trend.
 
-# In[139]:
+# In[112]:
 
 
-month_price = data.pivot_table(
-    
-    index=['month'],
-    
-    values=['last_price'],
-    
-    aggfunc='median')
+month_price = breakdowns['month_price']
 
 sns.barplot(data = month_price,
             
@@ -1536,16 +1384,10 @@ plt.show()
 
 # There is a relationship between these two factors. From February to April, the trend goes up, from May to June it falls, and then it recovers in June, September and November with a fall between these months.
 
-# In[140]:
+# In[113]:
 
 
-year_price = data.pivot_table(
-    
-    index=['year'],
-    
-    values=['last_price'],
-    
-    aggfunc='median')
+year_price = breakdowns['year_price']
 
 sns.barplot(data = year_price,
             
@@ -1572,23 +1414,17 @@ plt.show()
 
 # We will use a summary table to analyze the average price in 10 localities
 
-# In[142]:
+# In[114]:
 
 
-localities_price = data.pivot_table(
-    
-    index=['locality_name'],
-    
-    values=['price_per_meter'],
-                                        
-    aggfunc=['count','mean']).round().sort_values(
+localities_price = breakdowns['localities_price'].round().sort_values(
     
     by=('count', 'price_per_meter'),
     
     ascending=False)
 
 
-# In[143]:
+# In[115]:
 
 
 localities_price.head(10)
@@ -1600,26 +1436,24 @@ localities_price.head(10)
 
 # First we are going to analyze the correlation between these two variables, and then generate a pivot table to complete the check.
 
-# In[144]:
+# In[116]:
 
 
-data['last_price'].corr(data['km_to_center'])
+correlations.loc['last_price', 'km_to_center']
 
 
-# In[145]:
+# In[117]:
 
 
-data.plot(
+density_scatter(
+    
+    data,
     
     x='km_to_center',
     
     y='last_price',
     
-    kind='scatter',
-    
-    alpha=0.5,
-    
-    grid=True,
+    ylim=(300000, 30000000),
     
     figsize=(10,5)
 
@@ -1635,27 +1469,19 @@ plt.show()
 
 # We are creating a pivot table for St. Petersburg to see if the correlation remains the same.
 
-# In[146]:
+# In[118]:
 
 
-center_price = data.query(
-    
-    'locality_name == "Санкт-Петербург"').pivot_table(
-    
-    index=['km_to_center'],
-    
-    values=['last_price'],
-    
-    aggfunc='mean').round()
+center_price = breakdowns['center_price'].round()
 
 
-# In[147]:
+# In[119]:
 
 
 center_price.head(10)
 
 
-# In[153]:
+# In[120]:
 
 
 center_price.plot(y='last_price',
@@ -1683,32 +1509,25 @@ plt.show()
 
 # Now let's see how much each kilometer costs.
 
-# In[154]:
-
-
-def km_price(data):
-
-    for i in range(data.shape[0] - 1):
-
-        data.loc[i,'km_price'] = data.loc[i,'last_price'] - data.loc[i + 1,'last_price']
-    
-    return data
+# In[121]:
 
 
-# In[155]:
+# km_price is the average price at one kilometer minus the average price at the next one, divided by the kilometers between them when some distance has no ads. The same works for any locality and any grouping column, see apartments.features.price_gradient.
 
+from apartments.features import price_gradient
 
-center_price = km_price(center_price)
+km_price = price_gradient(data, value='last_price', by='km_to_center', locality='Санкт-Петербург',
+                          localities=localities)
 
-center_price.head(20)
+km_price.head(20)
 
 
-# In[157]:
+# In[122]:
 
 
-sns.barplot(data = center_price,
+sns.barplot(data = km_price,
            
-           x=center_price.index,
+           x='km_to_center',
            
            y='km_price')
 
@@ -1729,6 +1548,53 @@ plt.show()
 
 # There are two sharp changes on the graph: one negative at the 26th kilometer, and the other positive at the 27th kilometer.
 
+# The distance to the center is not the only one we have. We put every ad in a zone of distance bands to the center, the airport, the nearest park and pond, and look at the price per square meter of the busiest zones.
+
+# In[123]:
+
+
+from apartments.spatial import DistanceGrid
+
+zones = DistanceGrid(data)
+
+zones.table().sort_values('count', ascending=False).head(10)
+
+
+# The correlations above look at one factor at a time. A linear model of the price per square meter on all of them together, with a coefficient for every locality, floor category and year, shows what every factor adds when the others are the same.
+
+# In[124]:
+
+
+from apartments.model import HedonicModel
+
+model = HedonicModel.fit(data)
+
+print('R2: {:.2f}'.format(model.r2(data)))
+
+model.coefficients().drop('locality_name', level='feature')
+
+# # Looking for Suspicious Ads
+
+# With the factors found above we can compare every ad with similar ones: the same locality, number of rooms, distance band to the center and year. The price per square meter is compared with the median of its peers, scaled by the median absolute deviation, so a few extreme ads do not move the reference. Ads with too few peers are compared with a wider group.
+
+# In[158]:
+
+
+from apartments.anomalies import score_listings
+
+scores = score_listings(data)
+
+scores['suspicious'].sum()
+
+
+# In[125]:
+
+
+data.join(scores).query('suspicious').sort_values('score').head(10)
+
+
+# Even after removing the outliers, there are ads whose price per meter is far from the one of their neighbours, both too cheap and too expensive. These are the first candidates for a manual check.
+
 # # Conclusion
 
 # The study was conducted on the basis of available data for the period from 2014 to 2019 on housing prices in the real estate market of St. Petersburg and its region.
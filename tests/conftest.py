@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from apartments.cleaning import clean, filter_outliers
+from apartments.features import add_features
+from apartments.loading import load_data
+
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'real_estate_data.csv')
+
+
+@pytest.fixture(scope='session')
+def path():
+    if not os.path.exists(DATA):
+        pytest.skip('real_estate_data.csv is not there')
+    return DATA
+
+
+# The session frames are shared: a test that changes one works on a copy.
+
+@pytest.fixture(scope='session')
+def raw(path):
+    return load_data(path)
+
+
+@pytest.fixture(scope='session')
+def cleaned(raw):
+    return clean(raw.copy())
+
+
+@pytest.fixture(scope='session')
+def research(cleaned):
+    data, _ = filter_outliers(cleaned)
+    return add_features(data)
@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from apartments.aggregation import REPORT_BREAKDOWNS, compute_breakdowns
+
+
+def _pivot_table(data, index, values, aggfunc, where=None):
+    # the pivot_table calls of the research
+    if where:
+        for column, value in where.items():
+            data = data.query('{} == @value'.format(column))
+    return data.pivot_table(index=[index], values=[values], aggfunc=aggfunc)
+
+
+@pytest.fixture(scope='module')
+def breakdowns(research):
+    return compute_breakdowns(research)
+
+
+@pytest.mark.parametrize('name', list(REPORT_BREAKDOWNS))
+def test_breakdown_matches_pivot_table(research, breakdowns, name):
+    expected = _pivot_table(research, *REPORT_BREAKDOWNS[name])
+    pd.testing.assert_frame_equal(breakdowns[name], expected, check_dtype=False,
+                                  check_index_type=False, check_column_type=False)
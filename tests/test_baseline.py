@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apartments.baseline import MarketBaseline
+
+
+def _exact(research, level):
+    values = research['price_per_meter'].astype('float64')
+    if not level:
+        median = values.median()
+        return pd.DataFrame({'median': [median], 'mad': [(values - median).abs().median()],
+                             'count': [values.count()]})
+    keys = [research[column] for column in level]
+    grouped = values.groupby(keys, observed=True)
+    deviations = (values - grouped.transform('median')).abs()
+    table = pd.DataFrame({
+        'median': grouped.median(),
+        'mad': deviations.groupby(keys, observed=True).median(),
+        'count': grouped.count(),
+    })
+    table.index = pd.MultiIndex.from_tuples(
+        [key if isinstance(key, tuple) else (key,) for key in table.index], names=level)
+    return table
+
+
+@pytest.fixture(scope='module')
+def baseline(research):
+    return MarketBaseline.fit(research, exact_peers=1000)
+
+
+def test_tables_match_groupby(research, baseline):
+    for level, table in zip(baseline.levels, baseline.tables()):
+        expected = _exact(research, level)
+        expected = expected[expected['count'] >= baseline.min_peers]
+        result = table.loc[expected.index] if level else table
+        np.testing.assert_array_equal(result['count'], expected['count'])
+        small = (expected['count'] <= baseline.exact_peers).to_numpy()
+        np.testing.assert_allclose(result['median'][small], expected['median'][small], rtol=1e-12)
+        np.testing.assert_allclose(result['mad'][small], expected['mad'][small], rtol=1e-12)
+        # larger groups come from the sketch
+        np.testing.assert_allclose(result['median'][~small], expected['median'][~small], rtol=0.005)
+        np.testing.assert_allclose(result['mad'][~small], expected['mad'][~small], rtol=0.05)
+
+
+def test_merged_and_reloaded_baselines_equal_one_pass(research, baseline, tmp_path):
+    merged = MarketBaseline(exact_peers=1000)
+    for start in range(0, len(research), 5000):
+        merged.merge(MarketBaseline.fit(research.iloc[start:start + 5000], exact_peers=1000))
+    merged.save(tmp_path / 'baseline.json')
+    loaded = MarketBaseline.load(tmp_path / 'baseline.json')
+    for result, expected in zip(loaded.tables(), baseline.tables()):
+        result = result.loc[expected.index] if isinstance(expected.index, pd.MultiIndex) else result
+        np.testing.assert_allclose(result.to_numpy(dtype='float64'),
+                                   expected.to_numpy(dtype='float64'), rtol=1e-9)
@@ -0,0 +1,16 @@
+import os
+
+import pandas as pd
+import pytest
+
+from apartments.cache import cache_path, load_clean
+
+
+@pytest.mark.parametrize('impute', [False, True])
+def test_cached_frame_equals_the_cleaned_one(path, tmp_path, impute):
+    cache_dir = str(tmp_path)
+    missed = load_clean(path, cache_dir, impute=impute)
+    assert os.path.exists(cache_path(path, cache_dir, impute))
+    hit = load_clean(path, cache_dir, impute=impute)
+    pd.testing.assert_frame_equal(hit, missed)
+    assert hit['locality_name'].cat.categories.dtype != object
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from apartments.cleaning import OUTLIER_RULES, filter_outliers
+
+
+QUERIES = [
+    'last_price > 30000000',
+    'rooms > 10',
+    'rooms > 7',
+    'ceiling_height > 5',
+    'ceiling_height < 2',
+    'living_area < 10',
+    'living_area > 150',
+    'kitchen_area < 5',
+    'kitchen_area > 30',
+]
+
+
+def _drop_chain(data):
+    # the anomalies section of the research, one copy per step
+    data = data.drop(data['last_price'].idxmin()).reset_index(drop=True)
+    data = data.drop(data['last_price'].idxmax()).reset_index(drop=True)
+    for query in QUERIES:
+        data = data.drop(data.query(query).index).reset_index(drop=True)
+    return data
+
+
+def test_filter_outliers_matches_the_drop_chain(cleaned):
+    filtered, _ = filter_outliers(cleaned)
+    pd.testing.assert_frame_equal(filtered, _drop_chain(cleaned))
+
+
+def test_report_counts_every_row_once(cleaned):
+    filtered, report = filter_outliers(cleaned)
+    removed = len(cleaned) - len(filtered)
+    assert report.loc['total', 'removed'] == removed
+    assert report['removed'].drop('total').sum() == removed
+    assert list(report.index[1:-1]) == [rule for rule, _, _, _ in OUTLIER_RULES]
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apartments.comps import COMP_CATEGORIES, COMP_FEATURES, CompsIndex
+
+
+def _features(research):
+    # the scaled features, the gaps filled with the median of the locality
+    numeric = research[COMP_FEATURES].astype('float64')
+    numeric = numeric / numeric.std(ddof=0).replace(0, 1)
+    locality = research['locality_name'].astype(object)
+    medians = numeric.groupby(locality).transform('median')
+    numeric = numeric.fillna(medians).fillna(numeric.median())
+    indicators = [pd.get_dummies(research[column].astype(object), dtype='float64') * np.sqrt(0.5)
+                  for column in COMP_CATEGORIES]
+    return pd.concat([numeric] + indicators, axis=1).to_numpy()
+
+
+@pytest.fixture(scope='module')
+def index(research):
+    return CompsIndex(research)
+
+
+def test_query_matches_brute_force(research, index):
+    features = _features(research)
+    locality = research['locality_name'].astype(object).to_numpy()
+    sample = research.index[::997]
+    found = index.query(research.loc[sample], k=5)
+    for label, comps in found.groupby('listing'):
+        row = research.index.get_loc(label)
+        candidates = np.flatnonzero(locality == locality[row])
+        distances = np.sqrt(((features[candidates] - features[row]) ** 2).sum(axis=1))
+        expected = np.sort(distances)[:5]
+        # from |q|² + |x|² - 2 q·x a distance of 0 comes out up to about 1e-7
+        np.testing.assert_allclose(comps['distance'], expected, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(
+            np.sqrt(((features[comps['position']] - features[row]) ** 2).sum(axis=1)),
+            comps['distance'], rtol=1e-9, atol=1e-6)
+        assert comps['rank'].tolist() == list(range(len(expected)))
+
+
+def test_exclude_self(research, index):
+    sample = research.loc[research.index[::997]]
+    found = index.query(sample, k=3, exclude_self=True)
+    assert (found['comp'] != found['listing']).all()
+    assert found.groupby('listing').size().max() == 3
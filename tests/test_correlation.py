@@ -0,0 +1,39 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from apartments.correlation import METHODS, correlation_matrix, grouped_correlations, numeric_columns
+
+
+@pytest.fixture(scope='module')
+def numeric(research):
+    return research[numeric_columns(research)].astype('float64')
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_matrix_matches_pandas(research, numeric, method):
+    result = correlation_matrix(research, method=method)
+    pd.testing.assert_frame_equal(result, numeric.corr(method=method), rtol=0, atol=1e-13)
+
+
+def test_min_periods_matches_pandas(research, numeric):
+    result = correlation_matrix(research, min_periods=10000)
+    expected = numeric.corr(min_periods=10000)
+    pd.testing.assert_frame_equal(result, expected, rtol=0, atol=1e-13)
+
+
+def test_grouped_matches_groupby(research):
+    columns = ['last_price', 'total_area', 'living_area', 'km_to_center']
+    result = grouped_correlations(research, 'year', columns)
+    expected = research[columns + ['year']].astype('float64').groupby('year').corr()
+    pd.testing.assert_frame_equal(result, expected, rtol=0, atol=1e-13, check_index_type=False)
+
+
+def test_column_without_values_warns_nothing():
+    data = pd.DataFrame({'a': [1.0, 2.0, 3.0], 'b': [np.nan] * 3, 'c': [3.0, 1.0, 2.0]})
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        result = correlation_matrix(data)
+    assert result['b'].isna().all()
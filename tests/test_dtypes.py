@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from apartments.cleaning import clean
+from apartments.dtypes import MAX_DECIMALS, downcast
+
+
+def _values(series):
+    # the values as plain python objects, the missing ones as None
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _written(series, original):
+    # float32 keeps the values with the decimals they were written with
+    values = original.to_numpy(dtype='float64', na_value=np.nan)
+    decimals = next(decimals for decimals in range(MAX_DECIMALS + 1)
+                    if np.array_equal(np.round(values, decimals), values, equal_nan=True))
+    return pd.Series(np.round(series.to_numpy(dtype='float64', na_value=np.nan), decimals))
+
+
+def test_downcast_keeps_every_value(raw):
+    data = clean(raw.copy(), cast=False)
+    original = data.copy()
+    result, report = downcast(data)
+    columns = report.index.drop('total')
+    assert len(columns)
+    for column in columns:
+        assert result[column].dtype != original[column].dtype
+        if result[column].dtype == 'float32':
+            np.testing.assert_array_equal(_written(result[column], original[column]),
+                                          original[column].to_numpy(dtype='float64'))
+        else:
+            assert _values(result[column]) == _values(original[column]), column
+    for column in result.columns.difference(columns):
+        pd.testing.assert_series_equal(result[column], original[column])
+
+
+def test_report_totals(raw):
+    data = clean(raw.copy(), cast=False)
+    before = data.memory_usage(index=False, deep=True)
+    result, report = downcast(data)
+    after = result.memory_usage(index=False, deep=True)
+    columns = report.index.drop('total')
+    np.testing.assert_array_equal(report.loc[columns, 'bytes_before'], before[columns])
+    np.testing.assert_array_equal(report.loc[columns, 'bytes_after'], after[columns])
+    total = report.loc['total']
+    assert total['bytes_before'] == before[columns].sum()
+    assert total['bytes_after'] == after[columns].sum()
+    assert total['saved'] == before.sum() - after.sum()
+    assert (report.loc[columns, 'saved'] > 0).all()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from apartments.histograms import HistogramStore
+from apartments.report import REPORT_FIGURES, _rows
+
+
+def _values(research, column):
+    values = research[column].to_numpy(dtype='float64', na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+@pytest.fixture(scope='module')
+def store(research):
+    return HistogramStore(research)
+
+
+def test_exact_columns_match_numpy(research, store):
+    assert any(store.exact.values())
+    for column in store.columns:
+        if not store.exact[column]:
+            continue
+        values = _values(research, column)
+        for bins, range in [(10, None), (100, (0, 50)), (7, (2.5, 3.5))]:
+            counts, edges = store.histogram(column, bins, range)
+            expected, expected_edges = np.histogram(
+                values, bins, range if range is not None else store.limits[column])
+            np.testing.assert_array_equal(counts, expected, err_msg=column)
+            np.testing.assert_array_equal(edges, expected_edges)
+
+
+def test_fine_bins_match_numpy_on_their_edges(research):
+    store = HistogramStore(research, ['last_price', 'total_area'], max_distinct=100,
+                           fine_bins=1024)
+    for column in store.columns:
+        assert not store.exact[column]
+        values = _values(research, column)
+        for bins in [1, 8, 64, 1024]:
+            counts, _ = store.histogram(column, bins)
+            expected, _ = np.histogram(values, bins, store.limits[column])
+            np.testing.assert_array_equal(counts, expected, err_msg=column)
+
+
+def test_report_histograms_match_numpy(research):
+    for kind, column, _, options in REPORT_FIGURES.values():
+        if kind != 'hist':
+            continue
+        rows = _rows(research, options)
+        counts, _ = HistogramStore(rows, [column]).histogram(
+            column, options.get('bins', 10), options.get('range'))
+        values = _values(rows, column)
+        expected, _ = np.histogram(values, options.get('bins', 10),
+                                   options.get('range', (values.min(), values.max())))
+        np.testing.assert_array_equal(counts, expected, err_msg=column)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apartments.cleaning import fill_balcony, normalize_localities
+from apartments.imputation import (GroupMedianImputer, LOCAL_COLUMNS, MIN_COUNT,
+                                   fit_imputer, imputation_keys)
+
+
+@pytest.fixture(scope='module')
+def grouped(raw):
+    # the frame fit_imputer fits on
+    return normalize_localities(fill_balcony(raw.copy()))
+
+
+def _brute_force(data, column):
+    # the median of the first level with enough known values, by groupby
+    keys = imputation_keys(data)
+    values = data[column].astype('float64')
+    fill = pd.Series(np.nan, index=data.index)
+    for level in GroupMedianImputer().levels:
+        if column in LOCAL_COLUMNS and 'locality_name' not in level:
+            continue
+        if level:
+            grouped = values.groupby([keys[key] for key in level], observed=True)
+            medians, counts = grouped.transform('median'), grouped.transform('count')
+        else:
+            medians, counts = values.median(), values.count()
+            medians = pd.Series(medians, index=data.index)
+            counts = pd.Series(counts, index=data.index)
+        usable = fill.isna() & (counts >= MIN_COUNT)
+        fill[usable] = medians[usable]
+    return fill
+
+
+def test_fill_values_match_groupby(raw, grouped):
+    fills = fit_imputer(raw).fill_values(grouped)
+    for column in fills.columns:
+        np.testing.assert_allclose(fills[column], _brute_force(grouped, column), rtol=1e-12,
+                                   err_msg=column)
+
+
+def test_transform_fills_only_the_gaps(raw, grouped):
+    imputer = fit_imputer(raw)
+    filled = imputer.transform(grouped.copy())
+    fills = imputer.fill_values(grouped)
+    for column in imputer.columns:
+        missing = grouped[column].isna()
+        expected = fills[column][missing]
+        if pd.api.types.is_integer_dtype(grouped[column].dtype):
+            expected = expected.round()
+        pd.testing.assert_series_equal(filled[column][~missing], grouped[column][~missing])
+        np.testing.assert_array_equal(filled[column][missing].to_numpy(dtype='float64',
+                                                                       na_value=np.nan),
+                                      expected.to_numpy())
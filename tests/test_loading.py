@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from apartments.cleaning import clean, filter_outliers
+from apartments.features import add_features
+from apartments.loading import load_data
+from apartments.parallel import run_parallel
+
+
+@pytest.fixture
+def header_only(path, tmp_path):
+    with open(path, encoding='utf-8') as f:
+        header = f.readline()
+    empty = tmp_path / 'empty.csv'
+    empty.write_text(header, encoding='utf-8')
+    return str(empty)
+
+
+def test_header_only_file_has_the_types_of_the_data(header_only, raw):
+    data = load_data(header_only)
+    assert len(data) == 0
+    # locality_name is a category without any category
+    pd.testing.assert_series_equal(data.dtypes.astype(str), raw.dtypes.astype(str))
+
+
+def test_header_only_file_goes_through_the_research(header_only, research):
+    data = add_features(filter_outliers(clean(load_data(header_only)))[0])
+    assert len(data) == 0
+    assert list(data.columns) == list(research.columns)
+
+    data, _ = run_parallel(header_only, n_jobs=1)
+    assert len(data) == 0
+    assert list(data.columns) == list(research.columns)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apartments.locality import CITY, LOCALITY_NAMES, LocalityIndex, normalize_locality_names
+from apartments.report import REPORT_FIGURES, _rows
+
+
+def _loop(names):
+    # the cleanup loop of the research, on plain strings instead of .loc
+    names = list(names)
+    for i in range(len(names)):
+        if pd.isna(names[i]) != True:  # noqa: E712
+            for x in LOCALITY_NAMES:
+                if x in names[i]:
+                    names[i] = names[i].replace(x, '', 1)
+                    names[i] = names[i].lstrip()
+    return names
+
+
+def test_normalize_matches_the_loop(raw):
+    names = raw['locality_name'].astype(object)
+    expected = pd.Series(_loop(names), index=names.index, dtype=object, name='locality_name')
+    result = normalize_locality_names(raw['locality_name']).astype(object)
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_normalize_keeps_missing_names():
+    series = pd.Series(['посёлок Мурино', None, 'деревня Кудрово', 'Мурино'])
+    result = normalize_locality_names(series)
+    assert list(result.isna()) == [False, True, False, False]
+    assert list(result.dropna().astype(object)) == ['Мурино', 'Кудрово', 'Мурино']
+    assert list(result.cat.categories) == ['Мурино', 'Кудрово']
+
+
+@pytest.mark.parametrize('kind', ['category', 'object'])
+def test_index_matches_comparisons(research, kind):
+    names = research['locality_name'].astype(kind)
+    index = LocalityIndex(names)
+    counts = names.value_counts()
+    np.testing.assert_array_equal(index.counts(), counts.loc[list(index.names)])
+    assert len(index.names) == len(counts)
+    for wanted in [CITY, 'Пушкин', 'Нет такого', [CITY, 'Мурино', 'Кудрово']]:
+        expected = names.isin(wanted if isinstance(wanted, list) else [wanted]).to_numpy()
+        np.testing.assert_array_equal(index.positions(wanted), np.flatnonzero(expected))
+        pd.testing.assert_frame_equal(index.select(research, wanted), research[expected])
+        pd.testing.assert_frame_equal(index.exclude(research, wanted), research[~expected])
+
+
+def test_report_rows_match_comparisons(research):
+    for _, _, _, options in REPORT_FIGURES.values():
+        where = options.get('where')
+        if not where:
+            continue
+        mask = research['locality_name'].eq(where['locality_name']).fillna(False).to_numpy()
+        expected = research[~mask if options.get('exclude') else mask]
+        pd.testing.assert_frame_equal(_rows(research, options), expected)
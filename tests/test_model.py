@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from apartments.model import HedonicModel
+
+
+def test_incremental_fit_equals_full_refit(research):
+    # one batch per period, so every batch brings years the model has
+    # not seen yet
+    batches = [research[research['year'] < 2017],
+               research[research['year'] == 2017],
+               research[research['year'] > 2017]]
+    incremental = HedonicModel.fit(batches[0])
+    for batch in batches[1:]:
+        incremental.update(batch)
+    full = HedonicModel.fit(pd.concat(batches))
+
+    assert incremental.count == full.count
+    assert incremental.levels == full.levels
+    pd.testing.assert_series_equal(incremental.coefficients(), full.coefficients(),
+                                   rtol=1e-9)
+    np.testing.assert_allclose(incremental.predict(research), full.predict(research),
+                               rtol=1e-9)
+
+
+def test_saved_model_predicts_the_same(research, tmp_path):
+    model = HedonicModel.fit(research)
+    model.save(tmp_path / 'model.json')
+    loaded = HedonicModel.load(tmp_path / 'model.json')
+    pd.testing.assert_series_equal(loaded.predict(research), model.predict(research))
@@ -0,0 +1,19 @@
+import pandas as pd
+import pytest
+
+from apartments.cleaning import filter_outliers
+from apartments.parallel import run_parallel
+
+
+@pytest.fixture(scope='module')
+def serial(cleaned, research):
+    _, report = filter_outliers(cleaned)
+    return research, report
+
+
+@pytest.mark.parametrize('parts', [1, 3, 7, 100])
+def test_run_parallel_matches_serial(path, serial, parts):
+    data, report = run_parallel(path, n_jobs=2, parts=parts)
+    # the types too: they must not depend on the parts
+    pd.testing.assert_frame_equal(data, serial[0])
+    pd.testing.assert_frame_equal(report, serial[1])
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from apartments.profiling import MissingProfile
+
+
+@pytest.mark.parametrize('block_rows', [1000, 7777, 1000000])
+def test_profile_matches_isna(raw, block_rows):
+    profile = MissingProfile(raw, block_rows=block_rows)
+    mask = raw.isna()
+    pd.testing.assert_series_equal(profile.counts, mask.sum().astype('int64'))
+    pd.testing.assert_series_equal(profile.percentages, mask.mean() * 100)
+
+    expected = pd.DataFrame({
+        row: {column: int((mask[row] & mask[column]).sum()) for column in raw.columns}
+        for row in raw.columns
+    }).T
+    pd.testing.assert_frame_equal(profile.co_missing, expected.loc[raw.columns, raw.columns])
+
+
+def test_breakdown_matches_groupby(raw):
+    profile = MissingProfile(raw, block_rows=5000)
+    groups = raw['first_day_exposition'].dt.year.rename('year')
+    expected = raw.isna().groupby(groups).mean() * 100
+    pd.testing.assert_frame_equal(profile.by(groups), expected)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from apartments.sketches import QuantileSketch, SketchTable
+from apartments.streaming import PIVOTS, stream_report
+
+
+QUANTILES = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+COLUMNS = ['last_price', 'total_area', 'living_area', 'kitchen_area', 'days_exposition']
+
+
+def test_interpolates_like_pandas():
+    assert QuantileSketch().update([2e6, 3e6]).median() == 2.5e6
+    result = QuantileSketch().update([1, 2, 3, 4]).quantile([0.25, 0.5, 0.75])
+    np.testing.assert_allclose(result, [1.75, 2.5, 3.25], rtol=0.005)
+
+
+@pytest.mark.parametrize('column', COLUMNS)
+def test_quantiles_within_the_relative_accuracy(research, column):
+    values = research[column].astype('float64')
+    sketch = QuantileSketch(0.005).update(values.to_numpy())
+    expected = values.quantile(QUANTILES).to_numpy()
+    np.testing.assert_allclose(sketch.quantile(QUANTILES), expected, rtol=0.005)
+
+
+def test_merged_sketches_equal_one_pass(research):
+    values = research['last_price'].to_numpy(dtype='float64')
+    whole = QuantileSketch().update(values)
+    merged = QuantileSketch()
+    for part in np.array_split(values, 7):
+        merged.merge(QuantileSketch().update(part))
+    assert merged.count == whole.count
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    np.testing.assert_array_equal(merged.quantile(QUANTILES), whole.quantile(QUANTILES))
+    assert merged.mean() == pytest.approx(whole.mean(), rel=1e-12)
+    assert merged.std() == pytest.approx(whole.std(), rel=1e-9)
+
+
+def test_merged_tables_equal_one_pass(research):
+    whole = SketchTable(['last_price'], by='rooms').update(research)
+    merged = SketchTable(['last_price'], by='rooms')
+    for start in range(0, len(research), 5000):
+        merged.merge(SketchTable(['last_price'], by='rooms').update(research.iloc[start:start + 5000]))
+    pd.testing.assert_frame_equal(merged.median(), whole.median())
+    pd.testing.assert_frame_equal(merged.count(), whole.count())
+
+
+def test_streaming_pivots_within_the_relative_accuracy(path, research):
+    report = stream_report(path, chunksize=5000)
+    for name, column in PIVOTS.items():
+        expected = research.groupby(column, observed=True)['last_price'].median()
+        result = report.pivot(name)['last_price']
+        np.testing.assert_allclose(result.to_numpy(), expected.loc[result.index].to_numpy(),
+                                   rtol=0.005)
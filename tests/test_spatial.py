@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from apartments.spatial import DISTANCE_BANDS, STATISTICS, DistanceGrid
+
+
+def _bands(research):
+    # the band of every distance by pd.cut, 'unknown' when it is missing
+    return pd.DataFrame({
+        column: pd.cut(research[column].astype('float64'), edges, right=False)
+        .astype(object).where(research[column].notna(), 'unknown')
+        for column, edges in DISTANCE_BANDS.items()
+    }, index=research.index)
+
+
+def test_lookup_matches_groupby(research):
+    grid = DistanceGrid(research)
+    bands = _bands(research)
+    grouped = research['price_per_meter'].astype('float64').groupby(
+        [bands[column].astype(str) for column in bands], dropna=False)
+    expected = pd.DataFrame({statistic: grouped.transform(statistic) for statistic in STATISTICS})
+    result = grid.lookup(research)
+    np.testing.assert_array_equal(result['count'], expected['count'])
+    np.testing.assert_allclose(result[STATISTICS[1:]], expected[STATISTICS[1:]], rtol=1e-12)
+
+
+def test_comparables_share_the_cell(research):
+    grid = DistanceGrid(research)
+    bands = _bands(research).astype(str)
+    for label in research.index[::2000]:
+        same = (bands == bands.loc[label]).all(axis=1).to_numpy()
+        pd.testing.assert_frame_equal(grid.comparables(research, research.loc[label]),
+                                      research[same])
+    assert grid.table()['count'].sum() == len(research)
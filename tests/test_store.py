@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from apartments.store import open_store, write_store
+
+
+def test_store_round_trip(tmp_path):
+    data = pd.DataFrame({
+        'rooms': pd.array([1, None, 3, 2], dtype='Int8'),
+        'ceiling_height': pd.array([2.7, 2.5, None, 3.0], dtype='Float32'),
+        'is_apartment': pd.array([True, None, False, False], dtype='boolean'),
+        'studio': np.array([False, True, False, False]),
+        'locality_name': pd.Categorical(['Санкт-Петербург', None, 'Пушкин', 'Санкт-Петербург']),
+        'floor_category': ['первый', 'другой', None, 'последний'],
+        'first_day_exposition': pd.to_datetime(['2019-03-07', '2018-12-04', None, '2015-08-20']),
+        'last_price': np.array([13e6, 3.35e6, 5.196e6, 64.9e6]),
+    })
+    store = write_store(data, str(tmp_path / 'store'))
+    result = open_store(store.path).frame()
+    expected = data.assign(floor_category=data['floor_category'].astype('category'))
+    pd.testing.assert_frame_equal(result, expected)
+
+    rows = store.frame(['rooms', 'locality_name'], locality_name='Санкт-Петербург')
+    pd.testing.assert_frame_equal(rows, expected.loc[[0, 3], ['rooms', 'locality_name']])
+
+
+def test_store_of_the_data(cleaned, tmp_path):
+    result = write_store(cleaned, str(tmp_path / 'store')).frame()
+    for column in cleaned.columns:
+        expected = cleaned[column]
+        if not isinstance(expected.dtype, pd.CategoricalDtype) and expected.dtype == object:
+            expected = expected.astype('category')
+        pd.testing.assert_series_equal(result[column], expected, check_index=False)